@@ -0,0 +1,106 @@
+import hashlib
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import versions
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Serializer mixin keeping only the fields named in the ``fields`` context
+    entry (set by SparseFieldsetViewMixin). Without it every field is kept.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if requested is not None:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Lets read requests ask for a subset of fields with ``?fields=a,b,c``.
+
+    ``field_plans`` maps serializer fields to what the query needs to produce
+    them: ``columns`` for only(), ``related`` for select_related() and
+    ``needs`` naming annotations or prefetches the view adds itself. Fields
+    without a plan are assumed to be model columns of the same name.
+    """
+    field_plans = {}
+    always_included = ('id',)
+
+    def sparse_fields(self):
+        """The requested field names, or None when every field is wanted."""
+        if self.request.method != 'GET':
+            return None
+        param = self.request.query_params.get('fields')
+        if not param:
+            return None
+        return {name.strip() for name in param.split(',') if name.strip()} | set(self.always_included)
+
+    def query_plan(self, fields):
+        """(columns, related, needs) required to serialize ``fields``."""
+        model_fields = {field.name for field in self.get_queryset_model()._meta.concrete_fields}
+        columns, related, needs = {'id'}, set(), set()
+        for name in fields:
+            plan = self.field_plans.get(name)
+            if plan is None:
+                if name in model_fields:
+                    columns.add(name)
+                continue
+            columns.update(plan.get('columns', ()))
+            related.update(plan.get('related', ()))
+            needs.update(plan.get('needs', ()))
+        return columns, related, needs
+
+    def get_queryset_model(self):
+        return self.get_serializer_class().Meta.model
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.sparse_fields()
+        return context
+
+
+class VersionedETagMixin:
+    """
+    Strong ETags for list and retrieve built from change versions (see
+    core.versions) instead of the response body, so a client revalidating an
+    unchanged resource gets a 304 before anything is queried or serialized.
+
+    Views name the versions their output depends on in ``etag_versions()``;
+    the viewer and the full query string (page cursor, fields, filters) are
+    part of the tag as well.
+    """
+
+    def etag_versions(self):
+        raise NotImplementedError
+
+    def get_etag(self, request):
+        parts = [
+            *(str(version) for version in versions.get_versions(*self.etag_versions())),
+            str(request.user.pk),
+            request.get_full_path(),
+            request.accepted_media_type or '',
+        ]
+        return '"%s"' % hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def _conditional(self, request, render, *args, **kwargs):
+        etag = self.get_etag(request)
+        candidates = [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]
+        if etag in candidates or '*' in candidates:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = render(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
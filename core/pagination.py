@@ -0,0 +1,67 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework import pagination
+
+
+def encode_cursor(value, pk):
+    """Opaque cursor for the row whose ordering key is (value, pk)."""
+    payload = json.dumps([value.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (datetime, pk) from encode_cursor, or None if the cursor is invalid."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = parse_datetime(value)
+    except (ValueError, TypeError):
+        return None
+    if value is None or not isinstance(pk, int):
+        return None
+    return value, pk
+
+
+def keyset_page(queryset, field, cursor=None, page_size=20, descending=True):
+    """
+    One page of ``queryset`` ordered by (field, pk), starting after ``cursor``.
+
+    Unlike OFFSET pagination the database seeks straight to the cursor through
+    the (field, pk) index, so every page costs the same and no COUNT is run.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    order = [f'-{field}', '-pk'] if descending else [field, 'pk']
+    queryset = queryset.order_by(*order)
+
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        value, pk = position
+        lookup = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'pk__{lookup}': pk})
+        )
+
+    # Fetch one extra row to learn whether another page exists
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return items, next_cursor
+
+
+class CursorPagination(pagination.CursorPagination):
+    """
+    Default pagination for the REST API. Cursor pages seek through an index
+    like keyset_page above and never run a COUNT, and they stay stable while
+    rows are being added. Views pick their ordering with ``ordering`` or an
+    OrderingFilter.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-pk'
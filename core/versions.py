@@ -0,0 +1,41 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+# Change versions
+#
+# A version is a number stored in the cache under a name ("events",
+# "comments:12", ...): the time of the last change in milliseconds. Writers
+# bump the versions a change touches, and readers build ETags and cache keys
+# from them, so nothing has to be recomputed to learn whether it changed.
+# Using the clock as the starting value keeps versions moving forward after
+# the cache is cleared.
+
+
+def _version_key(name):
+    # Names may contain spaces and other characters memcached rejects
+    return f"version:{hashlib.md5(name.encode('utf-8')).hexdigest()}"
+
+
+def touch(*names):
+    """Record that the given names changed now."""
+    now = int(time.time() * 1000)
+    for name in names:
+        key = _version_key(name)
+        previous = cache.get(key) or 0
+        cache.set(key, max(now, previous + 1), None)
+
+
+def get_versions(*names):
+    """Current version of each name, initialising missing ones to now."""
+    versions = []
+    for name in names:
+        key = _version_key(name)
+        version = cache.get(key)
+        if version is None:
+            version = int(time.time() * 1000)
+            cache.add(key, version, None)
+            version = cache.get(key, version)
+        versions.append(version)
+    return versions
@@ -1,3 +1,67 @@
-from django.contrib import admin
+import io
 
-# Register your models here.
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect, render
+from django.urls import path
+
+from .importer import IMPORT_FORMATS, import_events
+from .models import Event, EventCategory
+
+
+class EventImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV (title, start_date, end_date, ...) or ICS file")
+    dry_run = forms.BooleanField(required=False, help_text="Only validate the file")
+
+
+@admin.register(EventCategory)
+class EventCategoryAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('title', 'start_date', 'end_date', 'status', 'category', 'organizer')
+    list_filter = ('status', 'event_type', 'category')
+    search_fields = ('title', 'location')
+    date_hierarchy = 'start_date'
+    list_select_related = ('category', 'organizer__user')
+    raw_id_fields = ('organizer', 'campus', 'series')
+    change_list_template = 'admin/events/event/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='events_event_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """Import a term schedule; rows without an organizer are attributed to the uploader."""
+        if not self.has_add_permission(request):
+            return redirect('admin:events_event_changelist')
+
+        form = EventImportForm(request.POST or None, request.FILES or None)
+        report = None
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            file_format = upload.name.rsplit('.', 1)[-1].lower()
+            if file_format not in IMPORT_FORMATS:
+                form.add_error('file', "Upload a .csv or .ics file")
+            else:
+                lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+                report = import_events(
+                    lines, file_format,
+                    default_organizer=getattr(request.user, 'profile', None),
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+                level = messages.WARNING if report.errors else messages.SUCCESS
+                self.message_user(request, str(report), level)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import events',
+            'form': form,
+            'report': report,
+        }
+        return render(request, 'admin/events/event/import_events.html', context)
@@ -3,21 +3,18 @@ from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Event, EventRegistration, Comment
+from core.api import SparseFieldsetViewMixin, VersionedETagMixin
+from core.pagination import CursorPagination
+from . import versions
+from .models import Event, Comment
 from .serializers import (
-    EventSerializer, EventRegistrationSerializer,
-    CommentSerializer
+    EventSerializer, EventDetailSerializer, EventRegistrationSerializer,
+    CommentSerializer, EventUpdateSerializer, EventBulkItemSerializer
 )
+from .bulk import MAX_BULK_EVENTS, apply_bulk_changes, registered_counts, validate_changes
 from .filters import EventFilter
-# events/api_views.py
-from rest_framework import viewsets, status
-from rest_framework.response import Response
-from .models import Event
-from .serializers import EventUpdateSerializer
-
 
 
 class IsOrganizerOrReadOnly(permissions.BasePermission):
@@ -27,87 +24,93 @@ class IsOrganizerOrReadOnly(permissions.BasePermission):
         return obj.organizer.user == request.user or request.user.is_staff
 
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventUpdatePermission(permissions.BasePermission):
+    """
+    Custom permission to only allow event organizers or staff to update event
+    """
+    def has_object_permission(self, request, view, obj):
+        # Allow staff or event organizer to update
+        return (
+            request.user.is_staff or 
+            request.user == obj.organizer.user
+        )
+
+
+def viewer_profile(request):
+    if request.user.is_authenticated:
+        return getattr(request.user, 'profile', None)
+    return None
+
+
+class EventViewSet(VersionedETagMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated, IsOrganizerOrReadOnly]
     filterset_class = EventFilter  # Use the custom EventFilter class
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'description']
-    ordering_fields = ['start_date', 'created_at']
+    ordering_fields = ['start_date', 'end_date', 'title']
+    ordering = ['-start_date', '-id']
 
-    def get_queryset(self):
-        # Optimize queryset with related fields
-        return Event.objects.all().select_related(
-            'category', 'university', 'organizer'
-        ).prefetch_related('comments', 'reactions')
-
-    def perform_create(self, serializer):
-        serializer.save(organizer=self.request.user.profile)
-
-    @action(detail=True, methods=['post'])
-    def register(self, request, pk=None):
-        event = self.get_object()
-        serializer = EventRegistrationSerializer(
-            data={'event': event.id},
-            context={'request': request}
-        )
-        
-        if serializer.is_valid():
-            serializer.save(participant=request.user.profile)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    # What each serializer field needs from the query, for ?fields=
+    field_plans = {
+        'category': {'columns': ['category', 'category__name', 'category__description'],
+                     'related': ['category']},
+        'category_id': {},
+        'campus': {'columns': ['campus', 'campus__campus'], 'related': ['campus']},
+        'organizer_details': {'columns': ['organizer', 'organizer__profile_pic', 'organizer__user',
+                                          'organizer__user__username'],
+                              'related': ['organizer__user']},
+        'reactions_count': {'needs': ['comment_counts']},
+        'remaining_slots': {'columns': ['max_participants'], 'needs': ['registration_counts']},
+        'is_registered': {'needs': ['viewer_registration']},
+        'comments': {'needs': ['comments']},
+    }
 
+    def get_queryset(self):
+        # Everything the serializer reads is joined or annotated here, so the
+        # number of queries doesn't grow with the number of events listed
+        profile = viewer_profile(self.request)
+        fields = self.sparse_fields()
+        if fields is None:
+            queryset = Event.objects.select_related('category', 'campus', 'organizer__user')
+            needs = {'comment_counts', 'registration_counts', 'viewer_registration', 'comments'}
+        else:
+            columns, related, needs = self.query_plan(fields)
+            # Cursor pagination reads the ordering columns from every row
+            columns.update(self.ordering_fields)
+            queryset = Event.objects.only(*columns)
+            if related:
+                queryset = queryset.select_related(*related)
 
+        if 'registration_counts' in needs:
+            queryset = queryset.with_registration_counts()
+        if 'comment_counts' in needs:
+            queryset = queryset.with_comment_counts()
+        if 'viewer_registration' in needs:
+            queryset = queryset.with_viewer_registration(profile)
+        if self.action == 'retrieve' and 'comments' in needs:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'comments',
+                    queryset=Comment.objects.select_related('user__user').with_like_state(profile)
+                )
+            )
+        return queryset
 
-class CommentViewSet(viewsets.ModelViewSet):
-    serializer_class = CommentSerializer
-    permission_classes = [IsAuthenticated]
+    def etag_versions(self):
+        if self.action == 'retrieve':
+            return [versions.EVENTS, versions.REGISTRATIONS, versions.event_comments(self.kwargs['pk'])]
+        return [versions.EVENTS, versions.REGISTRATIONS, versions.COMMENTS]
 
-    def get_queryset(self):
-        return Comment.objects.filter(
-            event_id=self.kwargs['event_pk']
-        ).select_related('user').prefetch_related('likes', 'replies')
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return EventDetailSerializer
+        if self.action in ('update', 'partial_update'):
+            return EventUpdateSerializer
+        return EventSerializer
 
     def perform_create(self, serializer):
-        event = Event.objects.get(pk=self.kwargs['event_pk'])
-        serializer.save(event=event, user=self.request.user.profile)
-
-    @action(detail=True, methods=['post'])
-    def like(self, request, event_pk=None, pk=None):
-        comment = self.get_object()
-        user_profile = request.user.profile
-        
-        if user_profile in comment.likes.all():
-            comment.likes.remove(user_profile)
-            liked = False
-        else:
-            comment.likes.add(user_profile)
-            liked = True
-        
-        return Response({
-            'liked': liked,
-            'likes_count': comment.likes.count()
-        })
-        
-        
-class EventUpdatePermission(permissions.BasePermission):
-    """
-    Custom permission to only allow event organizers or staff to update event
-    """
-    def has_object_permission(self, request, view, obj):
-        # Allow staff or event organizer to update
-        return (
-            request.user.is_staff or 
-            request.user == obj.organizer.user
-        )
-
-class EventViewSet(viewsets.ModelViewSet):
-    """
-    Viewset for handling event updates with granular control
-    """
-    queryset = Event.objects.all()
-    serializer_class = EventUpdateSerializer
-    permission_classes = [IsAuthenticated, EventUpdatePermission]
+        serializer.save(organizer=self.request.user.profile)
 
     def partial_update(self, request, *args, **kwargs):
         """
@@ -123,15 +126,11 @@ class EventViewSet(viewsets.ModelViewSet):
             
             # Additional custom validations
             if 'max_participants' in request.data:
-                # Prevent reducing participants below current registrations
-                current_registrations = EventRegistration.objects.filter(
-                    event=instance, 
-                    status='registered'
-                ).count()
-                
+                # Prevent reducing participants below current registrations,
+                # which get_queryset already annotated
                 new_max = serializer.validated_data.get('max_participants', instance.max_participants)
                 
-                if new_max is not None and new_max < current_registrations:
+                if new_max is not None and new_max < instance.registered_count:
                     return Response({
                         'error': 'Cannot reduce max participants below current registered participants'
                     }, status=status.HTTP_400_BAD_REQUEST)
@@ -169,4 +168,159 @@ class EventViewSet(viewsets.ModelViewSet):
         return Response({
             'message': f'Event status updated to {new_status}',
             'new_status': new_status
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+    def _organized_events(self, request, ids):
+        """
+        The events ``ids`` loaded in one query, or an error Response if any is
+        missing or not organized by the requesting user.
+        """
+        if not ids or len(ids) > MAX_BULK_EVENTS:
+            return Response({
+                'error': f'Send between 1 and {MAX_BULK_EVENTS} events'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not all(isinstance(pk, int) for pk in ids) or len(set(ids)) != len(ids):
+            return Response({'error': 'Event ids must be unique integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        events = Event.objects.select_related('campus').in_bulk(ids)
+        missing = sorted(set(ids) - events.keys())
+        if missing:
+            return Response({'error': 'Events not found', 'ids': missing}, status=status.HTTP_404_NOT_FOUND)
+        if not request.user.is_staff:
+            forbidden = sorted(pk for pk, event in events.items() if event.organizer_id != request.user.profile.id)
+            if forbidden:
+                return Response({
+                    'error': 'You can only change events you organize', 'ids': forbidden
+                }, status=status.HTTP_403_FORBIDDEN)
+        return events
+
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request):
+        """
+        Change many events at once: ``{"events": [{"id": 1, "start_date": ...}, ...]}``.
+        Every entry is validated first and nothing is saved unless all pass.
+        """
+        entries = request.data.get('events')
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            return Response({'error': 'events must be a list of objects'}, status=status.HTTP_400_BAD_REQUEST)
+        events = self._organized_events(request, [entry.get('id') for entry in entries])
+        if isinstance(events, Response):
+            return events
+
+        # Capacity checks for the whole batch come from one grouped query
+        counts = registered_counts(list(events))
+        errors = {}
+        fields = set()
+        for entry in entries:
+            event = events[entry['id']]
+            changes = {field: value for field, value in entry.items() if field != 'id'}
+            serializer = EventBulkItemSerializer(event, data=changes, partial=True)
+            if not serializer.is_valid():
+                errors[event.pk] = serializer.errors
+                continue
+            item_errors = validate_changes(event, serializer.validated_data, counts.get(event.pk, 0))
+            if item_errors:
+                errors[event.pk] = item_errors
+                continue
+            for field, value in serializer.validated_data.items():
+                setattr(event, field, value)
+            fields.update(serializer.validated_data)
+
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        if fields:
+            apply_bulk_changes(list(events.values()), fields)
+        return Response({
+            'message': f'{len(events)} events updated',
+            'updated': sorted(events),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """Set the status of many events: ``{"ids": [1, 2], "status": "canceled"}``."""
+        new_status = request.data.get('status')
+        if new_status not in dict(Event.STATUS_CHOICES):
+            return Response({'error': 'A valid status is required'}, status=status.HTTP_400_BAD_REQUEST)
+        ids = request.data.get('ids')
+        events = self._organized_events(request, ids if isinstance(ids, list) else [])
+        if isinstance(events, Response):
+            return events
+
+        for event in events.values():
+            event.status = new_status
+        apply_bulk_changes(list(events.values()), ['status'])
+        return Response({
+            'message': f'{len(events)} events updated to {new_status}',
+            'updated': sorted(events),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def register(self, request, pk=None):
+        event = self.get_object()
+        serializer = EventRegistrationSerializer(
+            data={'event': event.id},
+            context={'request': request}
+        )
+        
+        if serializer.is_valid():
+            serializer.save(participant=request.user.profile)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+
+class CommentCursorPagination(CursorPagination):
+    # Newest first, served by the (event, -created_at, -id) index
+    ordering = ['-created_at', '-id']
+
+
+class CommentViewSet(VersionedETagMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    serializer_class = CommentSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CommentCursorPagination
+
+    field_plans = {
+        'user': {'columns': ['user', 'user__profile_pic', 'user__user', 'user__user__username'],
+                 'related': ['user__user']},
+        'likes_count': {'needs': ['like_state']},
+        'is_liked_by_user': {'needs': ['like_state']},
+    }
+
+    def get_queryset(self):
+        queryset = Comment.objects.filter(event_id=self.kwargs['event_pk'])
+        fields = self.sparse_fields()
+        if fields is None:
+            return queryset.select_related('user__user').with_like_state(viewer_profile(self.request))
+
+        columns, related, needs = self.query_plan(fields)
+        columns.add('created_at')
+        queryset = queryset.only(*columns)
+        if related:
+            queryset = queryset.select_related(*related)
+        if 'like_state' in needs:
+            queryset = queryset.with_like_state(viewer_profile(self.request))
+        return queryset
+
+    def etag_versions(self):
+        return [versions.event_comments(self.kwargs['event_pk'])]
+
+    def perform_create(self, serializer):
+        event = Event.objects.get(pk=self.kwargs['event_pk'])
+        serializer.save(event=event, user=self.request.user.profile)
+
+    @action(detail=True, methods=['post'])
+    def like(self, request, event_pk=None, pk=None):
+        comment = self.get_object()
+        user_profile = request.user.profile
+        
+        if comment.viewer_liked:
+            comment.likes.remove(user_profile)
+            liked = False
+        else:
+            comment.likes.add(user_profile)
+            liked = True
+        
+        return Response({
+            'liked': liked,
+            'likes_count': comment.likes_total + (1 if liked else -1)
+        })
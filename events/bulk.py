@@ -0,0 +1,68 @@
+# events/bulk.py
+from django.db import transaction
+from django.db.models import Count
+
+from . import ics, recurrence
+from .facets import EventFacetIndex, event_campus
+from .models import Event, EventRegistration
+from .reminders import reschedule_reminders
+from .status import refresh_event_status
+
+MAX_BULK_EVENTS = 500
+
+
+def registered_counts(event_ids):
+    """{event id: registered head count} for many events in one grouped query."""
+    return dict(
+        EventRegistration.objects.filter(event_id__in=event_ids, status='registered')
+        .values_list('event_id').annotate(total=Count('id')).order_by()
+    )
+
+
+def validate_changes(event, changes, registered):
+    """Errors for applying ``changes`` to ``event`` as a {field: [message]} dict."""
+    errors = {}
+    start = changes.get('start_date', event.start_date)
+    end = changes.get('end_date', event.end_date)
+    if start >= end:
+        errors['end_date'] = ["End date must be after start date."]
+
+    max_participants = changes.get('max_participants', event.max_participants)
+    if 'max_participants' in changes and max_participants is not None and max_participants < registered:
+        errors['max_participants'] = [
+            f"Cannot reduce max participants below the {registered} registered participants."
+        ]
+    return errors
+
+
+def apply_bulk_changes(events, fields):
+    """
+    Save ``fields`` of ``events`` with one bulk_update in a transaction.
+
+    bulk_update skips Event.save() and its signals, so the derived data they
+    maintain (facet index, calendar feeds, reminders, live status) is
+    refreshed here once for the whole batch.
+    """
+    fields = set(fields)
+    if fields & {'start_date', 'end_date'}:
+        for event in events:
+            if event.recurrence_rule:
+                event.recurrence_end = recurrence.series_end(event)
+        fields.add('recurrence_end')
+
+    with transaction.atomic():
+        Event.objects.bulk_update(events, sorted(fields), batch_size=MAX_BULK_EVENTS)
+        if 'start_date' in fields:
+            reschedule_reminders(events)
+
+        event_ids = [event.pk for event in events]
+        transaction.on_commit(lambda: [refresh_event_status(pk) for pk in event_ids])
+
+    EventFacetIndex.invalidate()
+    feeds = {ics.EVENTS_FEED}
+    for event in events:
+        feeds.add(ics.category_feed(event.category_id))
+        campus = event_campus(event)
+        if campus:
+            feeds.add(ics.campus_feed(campus))
+    ics.touch_feeds(*feeds)
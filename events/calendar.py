@@ -0,0 +1,109 @@
+# events/calendar.py
+import datetime
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import ics, recurrence
+from .models import Event
+
+CALENDAR_CACHE_TIMEOUT = 60 * 60
+MAX_WINDOW_DAYS = 62
+
+# Statuses shown on the calendar; listed explicitly so the query can use the
+# (is_public, status, start_date) index
+CALENDAR_STATUSES = ('draft', 'published')
+
+
+def window_bounds(start_day, end_day):
+    """Aware datetimes covering local days start_day..end_day inclusive."""
+    tz = timezone.get_current_timezone()
+    start = datetime.datetime.combine(start_day, datetime.time.min, tzinfo=tz)
+    end = datetime.datetime.combine(end_day + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz)
+    return start, end
+
+
+def events_in_window(start, end):
+    """
+    Public one-off events overlapping [start, end), one indexed range scan.
+    Recurring series and their stored occurrences are expanded separately.
+    """
+    return Event.objects.filter(
+        is_public=True,
+        status__in=CALENDAR_STATUSES,
+        start_date__lt=end,
+        end_date__gte=start,
+        recurrence_rule='',
+        series__isnull=True,
+    ).order_by('start_date', 'id')
+
+
+def occurrences_in_window(start, end):
+    series = recurrence.series_in_window(start, end).filter(
+        is_public=True,
+        status__in=CALENDAR_STATUSES,
+    )
+    return recurrence.expand(series, start, end)
+
+
+def build_calendar(start_day, end_day):
+    """
+    Events overlapping the window, bucketed per local day:
+
+        {"events": {"<key>": {...}}, "days": {"YYYY-MM-DD": [<key>, ...]}}
+
+    Each event is listed once and referenced from every day it spans. One-off
+    events are keyed by id; dates of recurring series that aren't stored yet
+    are keyed "<series id>@<start timestamp>".
+    """
+    start, end = window_bounds(start_day, end_day)
+    tz = timezone.get_current_timezone()
+    rows = list(events_in_window(start, end).values_list(
+        'id', 'title', 'start_date', 'end_date', 'location', 'event_type', 'category_id'
+    ))
+    rows += [
+        (occurrence.key, occurrence.title, occurrence.start_date, occurrence.end_date,
+         occurrence.location, occurrence.event_type, occurrence.category_id)
+        for occurrence in occurrences_in_window(start, end)
+    ]
+    rows.sort(key=lambda row: row[2])
+
+    events = {}
+    days = {(start_day + datetime.timedelta(days=offset)).isoformat(): []
+            for offset in range((end_day - start_day).days + 1)}
+    for key, title, starts, ends, location, event_type, category_id in rows:
+        key = str(key)
+        events[key] = {
+            'title': title,
+            'start': starts.isoformat(),
+            'end': ends.isoformat(),
+            'location': location,
+            'type': event_type,
+            'category': category_id,
+        }
+        day = max(timezone.localtime(starts, tz).date(), start_day)
+        last_day = min(timezone.localtime(ends, tz).date(), end_day)
+        while day <= last_day:
+            days[day.isoformat()].append(key)
+            day += datetime.timedelta(days=1)
+
+    return {
+        'start': start_day.isoformat(),
+        'end': end_day.isoformat(),
+        'events': events,
+        'days': days,
+    }
+
+
+def get_calendar(start_day, end_day):
+    """
+    Cached build_calendar. The cache key carries the global events feed
+    version, so any event change makes every cached window stale at once.
+    """
+    version, = ics.feed_versions(ics.EVENTS_FEED)
+    key = f'events:calendar:{start_day.isoformat()}:{end_day.isoformat()}:{version}'
+    data = cache.get(key)
+    if data is None:
+        data = build_calendar(start_day, end_day)
+        cache.set(key, data, CALENDAR_CACHE_TIMEOUT)
+    return data
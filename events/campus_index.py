@@ -0,0 +1,190 @@
+# events/campus_index.py
+import bisect
+import threading
+import unicodedata
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from profiles.models import Profile
+
+VERSION_CACHE_KEY = 'events:campus_index_version'
+DEFAULT_LIMIT = 10
+
+
+def normalize(name):
+    """Case, accent and whitespace insensitive form of a campus name."""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+def within_distance(word, query, limit):
+    """
+    Whether some prefix of ``word`` is within ``limit`` edits of ``query``
+    (Levenshtein distance, abandoned as soon as every cell exceeds the limit).
+    """
+    previous = list(range(len(word) + 1))
+    for i, char in enumerate(query, 1):
+        current = [i]
+        for j, other in enumerate(word, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != other),
+            ))
+        if min(current) > limit:
+            return False
+        previous = current
+    return min(previous) <= limit
+
+
+class CampusIndex:
+    """
+    In-process index of the distinct campus names on profiles.
+
+    Names are normalized and kept with the number of profiles using them.
+    Every word of every name goes into a sorted array, so a prefix lookup is
+    a bisect rather than a table scan; when prefixes alone don't fill the
+    result, words within one or two typos of the query are tried as well.
+
+    The index is built from a single grouped query on first use and kept
+    current by profile signals. Other processes learn about a change through
+    a version number in the cache and rebuild on their next lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._entries = {}   # normalized name -> {display name: profile count}
+        self._words = []     # sorted (word, normalized name) pairs
+
+    # Building and maintenance
+
+    def build(self):
+        rows = Profile.objects.exclude(campus__isnull=True).exclude(campus='').values_list(
+            'campus'
+        ).annotate(total=Count('id')).order_by()
+        with self._lock:
+            self._version = cache.get(VERSION_CACHE_KEY, 0)
+            self._entries = {}
+            for campus, total in rows:
+                key = normalize(campus)
+                if key:
+                    spellings = self._entries.setdefault(key, {})
+                    spellings[campus] = spellings.get(campus, 0) + total
+            self._words = sorted(
+                (word, key) for key in self._entries for word in self._index_words(key)
+            )
+
+    def _index_words(self, key):
+        words = key.split()
+        # The whole name is indexed too, so multi-word queries match by prefix
+        return set(words) | {key}
+
+    def _ensure_current(self):
+        if self._version is None or cache.get(VERSION_CACHE_KEY, 0) != self._version:
+            self.build()
+
+    def change(self, old_name, new_name):
+        """Move one profile from ``old_name`` to ``new_name`` (either may be empty)."""
+        if old_name == new_name:
+            return
+        with self._lock:
+            current = self._version is not None and cache.get(VERSION_CACHE_KEY, 0) == self._version
+            if current:
+                if old_name:
+                    self._adjust(old_name, -1)
+                if new_name:
+                    self._adjust(new_name, 1)
+            version = self._bump_version()
+            if current:
+                self._version = version
+
+    def invalidate(self):
+        """Make every process rebuild the index on its next lookup."""
+        with self._lock:
+            self._bump_version()
+
+    def _adjust(self, name, delta):
+        key = normalize(name)
+        if not key:
+            return
+        spellings = self._entries.get(key)
+        if spellings is None:
+            if delta <= 0:
+                return
+            spellings = self._entries[key] = {}
+            for word in self._index_words(key):
+                bisect.insort(self._words, (word, key))
+        total = spellings.get(name, 0) + delta
+        if total > 0:
+            spellings[name] = total
+        else:
+            spellings.pop(name, None)
+        if not spellings:
+            del self._entries[key]
+            for word in self._index_words(key):
+                position = bisect.bisect_left(self._words, (word, key))
+                if position < len(self._words) and self._words[position] == (word, key):
+                    del self._words[position]
+
+    def _bump_version(self):
+        try:
+            return cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            cache.add(VERSION_CACHE_KEY, 1, None)
+            return cache.get(VERSION_CACHE_KEY, 1)
+
+    # Lookups
+
+    def _display(self, key):
+        spellings = self._entries[key]
+        # Show the spelling most profiles use, preferring capitalised ones on a tie
+        name = max(spellings, key=lambda spelling: (
+            spellings[spelling], sum(char.isupper() for char in spelling), -len(spelling), spelling
+        ))
+        return name, sum(spellings.values())
+
+    def _prefix_matches(self, query):
+        start = bisect.bisect_left(self._words, (query,))
+        matches = {}
+        for word, key in self._words[start:]:
+            if not word.startswith(query):
+                break
+            # Names starting with the query rank above names with a later word matching
+            rank = 0 if key.startswith(query) else 1
+            matches[key] = min(rank, matches.get(key, rank))
+        return matches
+
+    def _fuzzy_matches(self, query):
+        limit = 1 if len(query) <= 5 else 2
+        matches = {}
+        for word, key in self._words:
+            if len(word) < len(query) - limit:
+                continue
+            if within_distance(word[:len(query) + limit], query, limit):
+                matches[key] = 2
+        return matches
+
+    def search(self, term, limit=DEFAULT_LIMIT):
+        """
+        Up to ``limit`` [(campus name, profile count)] for an autocomplete term,
+        best matches first: name prefix, then word prefix, then near misses,
+        each ordered by how many profiles use the campus.
+        """
+        query = normalize(term)
+        if not query:
+            return []
+        with self._lock:
+            self._ensure_current()
+            matches = self._prefix_matches(query)
+            if len(matches) < limit and len(query) >= 3:
+                for key, rank in self._fuzzy_matches(query).items():
+                    matches.setdefault(key, rank)
+            results = [(rank, *self._display(key)) for key, rank in matches.items()]
+        results.sort(key=lambda result: (result[0], -result[2], result[1]))
+        return [(name, total) for _, name, total in results[:limit]]
+
+
+campus_index = CampusIndex()
@@ -0,0 +1,38 @@
+import json
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
+from .status import event_status_group, get_event_status
+
+
+class EventStatusConsumer(AsyncWebsocketConsumer):
+    """Pushes status snapshots of one event to the browsers viewing it."""
+
+    async def connect(self):
+        self.user = self.scope["user"]
+        self.event_id = int(self.scope["url_route"]["kwargs"]["event_id"])
+        self.group_name = event_status_group(self.event_id)
+
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+
+        snapshot = await database_sync_to_async(get_event_status)(self.event_id)
+        if snapshot is None:
+            await self.close()
+            return
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        # Send the current state so the page doesn't need an initial poll
+        await self.send_snapshot(snapshot)
+
+    async def disconnect(self, close_code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def event_status(self, event):
+        await self.send_snapshot(event["snapshot"])
+
+    async def send_snapshot(self, snapshot):
+        await self.send(text_data=json.dumps({"type": "event_status", "success": True, **snapshot}))
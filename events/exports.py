@@ -0,0 +1,56 @@
+# events/exports.py
+import csv
+import json
+
+from .models import EventRegistration
+
+EXPORT_CHUNK_SIZE = 2000
+
+ATTENDEE_COLUMNS = [
+    'registration_id', 'name', 'email', 'username', 'status',
+    'waitlist_position', 'registration_date', 'attended',
+]
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def attendee_rows(event):
+    """
+    Yield one dict per registration of ``event``. Rows are read with
+    iterator() so memory stays flat however many people registered.
+    """
+    registrations = EventRegistration.objects.filter(
+        event=event
+    ).select_related('participant__user').only(
+        'id', 'name', 'email', 'status', 'waitlist_position',
+        'registration_date', 'attended', 'participant__user__username'
+    ).order_by('registration_date', 'id')
+
+    for registration in registrations.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {
+            'registration_id': registration.id,
+            'name': registration.name,
+            'email': registration.email or '',
+            'username': registration.participant.user.username,
+            'status': registration.status,
+            'waitlist_position': registration.waitlist_position,
+            'registration_date': registration.registration_date.isoformat(),
+            'attended': registration.attended,
+        }
+
+
+def stream_attendees_csv(event):
+    writer = csv.DictWriter(Echo(), fieldnames=ATTENDEE_COLUMNS)
+    yield writer.writeheader()
+    for row in attendee_rows(event):
+        yield writer.writerow(row)
+
+
+def stream_attendees_jsonl(event):
+    for row in attendee_rows(event):
+        yield json.dumps(row) + '\n'
@@ -0,0 +1,224 @@
+# events/facets.py
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from profiles.models import Profile
+
+from .models import Event, EventCategory
+
+FACET_INDEX_CACHE_KEY = 'events:facet_index'
+FACET_INDEX_TIMEOUT = 60 * 60
+
+# Facet names, in the order their values appear in an index cell key
+FACETS = ('campus', 'category', 'status', 'type')
+
+STATUS_LABELS = {
+    'upcoming': 'Upcoming',
+    'ongoing': 'Ongoing',
+    'completed': 'Completed',
+}
+
+
+def status_expression(now):
+    """Time based status bucket of an event, evaluated in SQL."""
+    return models.Case(
+        models.When(start_date__gt=now, then=models.Value('upcoming')),
+        models.When(end_date__lt=now, then=models.Value('completed')),
+        default=models.Value('ongoing'),
+        output_field=models.CharField(),
+    )
+
+
+def event_status_at(event, now):
+    """Python twin of status_expression for a single event."""
+    if event.start_date > now:
+        return 'upcoming'
+    if event.end_date < now:
+        return 'completed'
+    return 'ongoing'
+
+
+def event_campus(event):
+    """Campus name of an event, tolerating a campus profile that is being deleted."""
+    if not event.campus_id:
+        return None
+    try:
+        return event.campus.campus
+    except Profile.DoesNotExist:
+        return None
+
+
+def filter_events(queryset, filters):
+    """
+    Apply the browse filters (campus, category, status, type) to an Event queryset.
+    Unknown or empty values are ignored.
+    """
+    if filters.get('campus'):
+        queryset = queryset.filter(campus__campus=filters['campus'])
+    if filters.get('category'):
+        queryset = queryset.filter(category_id=filters['category'])
+    if filters.get('type'):
+        queryset = queryset.filter(event_type=filters['type'])
+
+    status = filters.get('status')
+    if status:
+        now = timezone.now()
+        if status == 'upcoming':
+            queryset = queryset.filter(start_date__gt=now)
+        elif status == 'ongoing':
+            queryset = queryset.filter(start_date__lte=now, end_date__gte=now)
+        elif status == 'completed':
+            queryset = queryset.filter(end_date__lt=now)
+    return queryset
+
+
+def browse_events(filters):
+    """Filtered event listing with comment counts computed in SQL."""
+    # A recurring series is listed once; its stored occurrences are not listed
+    events = Event.objects.filter(series__isnull=True).select_related(
+        'category'
+    ).with_comment_counts().order_by('-start_date')
+    return filter_events(events, filters)
+
+
+class EventFacetIndex:
+    """
+    Cached count of events per (campus, category, status, type) combination.
+
+    The whole index is built with a single grouped query and kept in the cache.
+    Event saves and deletes adjust the affected cells in place (see signals.py),
+    and the index rebuilds itself once the earliest start/end date it was built
+    against has passed, since that is when an event changes status bucket.
+    Facet counts for any combination of filters are then derived in Python,
+    so adding filters never adds queries.
+    """
+
+    def __init__(self):
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            data = cache.get(FACET_INDEX_CACHE_KEY)
+            if data is None or data['valid_until'] is not None and data['valid_until'] <= timezone.now():
+                data = self.build()
+            self._data = data
+        return self._data
+
+    def build(self):
+        now = timezone.now()
+        rows = Event.objects.filter(series__isnull=True).annotate(
+            facet_status=status_expression(now)
+        ).values_list(
+            'campus__campus', 'category_id', 'facet_status', 'event_type'
+        ).annotate(total=Count('id')).order_by()
+
+        # The index is only valid until the next event starts or ends
+        boundaries = Event.objects.filter(series__isnull=True).aggregate(
+            next_start=Min('start_date', filter=models.Q(start_date__gt=now)),
+            next_end=Min('end_date', filter=models.Q(end_date__gte=now)),
+        )
+        valid_until = min(
+            (value for value in boundaries.values() if value is not None),
+            default=None
+        )
+
+        data = {
+            'cells': {(campus, category, status, event_type): total
+                      for campus, category, status, event_type, total in rows},
+            'categories': dict(EventCategory.objects.values_list('id', 'name')),
+            'valid_until': valid_until,
+        }
+        cache.set(FACET_INDEX_CACHE_KEY, data, FACET_INDEX_TIMEOUT)
+        return data
+
+    def facet_counts(self, filters=None):
+        """
+        Return {facet: [(value, label, count), ...]} for the given filters.
+
+        Each facet is counted with every *other* active filter applied, so the
+        options shown for a facet are the ones that can still be combined with
+        the current selection.
+        """
+        filters = self._normalize(filters or {})
+        counts = {facet: Counter() for facet in FACETS}
+
+        for key, total in self.data['cells'].items():
+            mismatched = [facet for facet, value in zip(FACETS, key)
+                          if filters.get(facet) not in (None, value)]
+            if len(mismatched) > 1:
+                continue
+            for position, facet in enumerate(FACETS):
+                if not mismatched or mismatched == [facet]:
+                    if key[position] is not None:
+                        counts[facet][key[position]] += total
+
+        return {facet: self._labelled(facet, counter) for facet, counter in counts.items()}
+
+    def total(self, filters=None):
+        filters = self._normalize(filters or {})
+        return sum(
+            total for key, total in self.data['cells'].items()
+            if all(filters.get(facet) in (None, value) for facet, value in zip(FACETS, key))
+        )
+
+    def _normalize(self, filters):
+        normalized = {facet: filters[facet] for facet in FACETS if filters.get(facet)}
+        if 'category' in normalized:
+            try:
+                normalized['category'] = int(normalized['category'])
+            except (TypeError, ValueError):
+                normalized.pop('category')
+        return normalized
+
+    def _labelled(self, facet, counter):
+        if facet == 'category':
+            label = self.data['categories'].get
+        elif facet == 'status':
+            label = STATUS_LABELS.get
+        elif facet == 'type':
+            label = dict(Event.EVENT_TYPE_CHOICES).get
+        else:
+            label = str
+        return sorted(
+            ((value, label(value) or value, total) for value, total in counter.items()),
+            key=lambda item: (-item[2], str(item[1]))
+        )
+
+    # Incremental maintenance, called from events.signals
+
+    @classmethod
+    def cell_key(cls, event, now):
+        return (event_campus(event), event.category_id, event_status_at(event, now), event.event_type)
+
+    @classmethod
+    def adjust(cls, event, delta):
+        """Add ``delta`` to the cell ``event`` falls into, if the index is cached."""
+        data = cache.get(FACET_INDEX_CACHE_KEY)
+        if data is None or event.series_id:
+            return
+        now = timezone.now()
+        key = cls.cell_key(event, now)
+        total = data['cells'].get(key, 0) + delta
+        if total > 0:
+            data['cells'][key] = total
+        else:
+            data['cells'].pop(key, None)
+
+        # A new or moved event may change bucket before anything else does
+        boundary = event.start_date if event.start_date > now else event.end_date
+        if boundary >= now and (data['valid_until'] is None or boundary < data['valid_until']):
+            data['valid_until'] = boundary
+        cache.set(FACET_INDEX_CACHE_KEY, data, FACET_INDEX_TIMEOUT)
+
+    @classmethod
+    def is_cached(cls):
+        return cache.get(FACET_INDEX_CACHE_KEY) is not None
+
+    @classmethod
+    def invalidate(cls):
+        cache.delete(FACET_INDEX_CACHE_KEY)
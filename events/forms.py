@@ -1,9 +1,28 @@
 #events/forms.py
+import datetime
 from django import forms
+from django.utils import timezone
 from .models import Event, Comment, EventRegistration
 
 
 class EventForm(forms.ModelForm):
+    REPEAT_CHOICES = [
+        ('', 'Does not repeat'),
+        ('DAILY', 'Every day'),
+        ('WEEKLY', 'Every week'),
+        ('MONTHLY', 'Every month'),
+    ]
+
+    repeat = forms.ChoiceField(
+        choices=REPEAT_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    repeat_until = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
     class Meta:
         model = Event
         fields = ['title', 'description', 'event_type', 'start_date', 'end_date', 
@@ -70,7 +89,26 @@ class EventForm(forms.ModelForm):
         if event_type == 'text' and not content:
             raise forms.ValidationError("Content is required for text-based events.")
 
+        repeat = cleaned_data.get('repeat')
+        repeat_until = cleaned_data.get('repeat_until')
+        cleaned_data['recurrence_rule'] = ''
+        if repeat:
+            start_date = cleaned_data.get('start_date')
+            if not repeat_until:
+                raise forms.ValidationError("Choose when a repeating event stops repeating.")
+            if start_date and repeat_until < timezone.localtime(start_date).date():
+                raise forms.ValidationError("A repeating event must stop after its first date.")
+            # UNTIL is the end of the chosen local day, in UTC as RRULE requires
+            until = datetime.datetime.combine(
+                repeat_until, datetime.time.max, tzinfo=timezone.get_current_timezone()
+            ).astimezone(datetime.timezone.utc)
+            cleaned_data['recurrence_rule'] = f"FREQ={repeat};UNTIL={until:%Y%m%dT%H%M%SZ}"
+
         return cleaned_data
+
+    def save(self, commit=True):
+        self.instance.recurrence_rule = self.cleaned_data.get('recurrence_rule', '')
+        return super().save(commit=commit)
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
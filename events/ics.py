@@ -0,0 +1,150 @@
+# events/ics.py
+import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from core import versions
+
+ICS_CHUNK_SIZE = 500
+FEED_TOKEN_SALT = 'events.ics.user_feed'
+
+# Columns needed to render a VEVENT; feeds read these with values() only
+VEVENT_FIELDS = ('id', 'title', 'description', 'start_date', 'end_date',
+                 'location', 'status', 'category__name', 'recurrence_rule',
+                 'series_id', 'occurrence_start')
+
+
+# Feed versions
+#
+# Every feed has a change version (see core.versions). Signals bump the
+# versions a change touches, and the feed views derive their ETag and
+# Last-Modified from them, so a calendar client polling an unchanged feed
+# gets a 304 without the feed being rendered.
+
+EVENTS_FEED = 'events'
+
+
+def campus_feed(campus):
+    return f'campus:{campus}'
+
+
+def category_feed(category_id):
+    return f'category:{category_id}'
+
+
+def user_feed(profile_id):
+    return f'user:{profile_id}'
+
+
+def touch_feeds(*feeds):
+    """Record that the given feeds changed now."""
+    versions.touch(*feeds)
+
+
+def feed_versions(*feeds):
+    return versions.get_versions(*feeds)
+
+
+def feed_etag(*feeds):
+    return '-'.join(str(version) for version in feed_versions(*feeds))
+
+
+def feed_last_modified(*feeds):
+    newest = max(feed_versions(*feeds))
+    return datetime.datetime.fromtimestamp(newest / 1000, tz=datetime.timezone.utc)
+
+
+# Personal feed tokens
+#
+# Calendar clients don't send session cookies, so personal feeds are addressed
+# by a signed profile id instead of the logged in user.
+
+def user_feed_token(profile):
+    return signing.Signer(salt=FEED_TOKEN_SALT).sign(str(profile.pk))
+
+
+def profile_id_from_token(token):
+    try:
+        return int(signing.Signer(salt=FEED_TOKEN_SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+# Rendering
+
+def _escape(value):
+    return (str(value or '')
+            .replace('\\', '\\\\')
+            .replace(';', '\\;')
+            .replace(',', '\\,')
+            .replace('\r\n', '\\n')
+            .replace('\n', '\\n'))
+
+
+def _format_datetime(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _fold(line):
+    """Fold a content line at 75 octets as required by RFC 5545."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        cut = min(75 if not parts else 74, len(encoded))
+        # Don't split a multi-byte character
+        while cut < len(encoded) and encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def render_vevent(event, stamp):
+    host = settings.SITE_URL.split('://', 1)[-1]
+    # Stored occurrences of a series share its UID and name the date they replace
+    uid = event['series_id'] or event['id']
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:event-{uid}@{host}",
+        f'DTSTAMP:{stamp}',
+        f"DTSTART:{_format_datetime(event['start_date'])}",
+        f"DTEND:{_format_datetime(event['end_date'])}",
+        f"SUMMARY:{_escape(event['title'])}",
+        f"DESCRIPTION:{_escape(event['description'])}",
+        f"URL:{settings.SITE_URL}/events/{event['id']}/",
+    ]
+    if event['recurrence_rule']:
+        lines.append(f"RRULE:{event['recurrence_rule']}")
+    if event['series_id']:
+        lines.append(f"RECURRENCE-ID:{_format_datetime(event['occurrence_start'])}")
+    if event['location']:
+        lines.append(f"LOCATION:{_escape(event['location'])}")
+    if event['category__name']:
+        lines.append(f"CATEGORIES:{_escape(event['category__name'])}")
+    lines.append('STATUS:CANCELLED' if event['status'] == 'canceled' else 'STATUS:CONFIRMED')
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) for line in lines)
+
+
+def stream_calendar(name, events):
+    """
+    Yield an iCalendar document for an Event queryset one chunk at a time,
+    reading rows with iterator() so large feeds never sit in memory.
+    """
+    stamp = _format_datetime(timezone.now())
+    yield ''.join(_fold(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Campus Interaction//Events//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+    ])
+    rows = events.order_by('start_date').values(*VEVENT_FIELDS).iterator(chunk_size=ICS_CHUNK_SIZE)
+    for event in rows:
+        yield render_vevent(event, stamp)
+    yield 'END:VCALENDAR\r\n'
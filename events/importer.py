@@ -0,0 +1,312 @@
+# events/importer.py
+import csv
+import datetime
+import zoneinfo
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from profiles.models import Profile
+
+from . import ics, recurrence
+from .facets import EventFacetIndex
+from .models import Event, EventCategory
+from .reminders import schedule_missing_reminders
+
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_FORMATS = ('csv', 'ics')
+
+# CSV columns understood by the importer; only the first three are required
+CSV_COLUMNS = (
+    'title', 'start_date', 'end_date', 'description', 'location', 'category',
+    'organizer', 'event_type', 'max_participants', 'is_public', 'status',
+    'recurrence_rule',
+)
+
+ICS_PROPERTIES = {
+    'SUMMARY': 'title',
+    'DESCRIPTION': 'description',
+    'LOCATION': 'location',
+    'CATEGORIES': 'category',
+    'RRULE': 'recurrence_rule',
+    'STATUS': 'status',
+}
+ICS_STATUSES = {'CONFIRMED': 'published', 'TENTATIVE': 'draft', 'CANCELLED': 'canceled'}
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the message ends up in the report."""
+
+
+# Parsing
+#
+# Both parsers are generators yielding (line number, {field: raw value}) so
+# a file is never held in memory as a whole.
+
+def parse_csv(lines):
+    reader = csv.DictReader(lines)
+    missing = {'title', 'start_date', 'end_date'} - set(reader.fieldnames or ())
+    if missing:
+        raise RowError(f"Missing CSV columns: {', '.join(sorted(missing))}")
+    for row in reader:
+        yield reader.line_num, {column: (row.get(column) or '').strip() for column in CSV_COLUMNS}
+
+
+def _unescape(value):
+    return (value.replace('\\n', '\n').replace('\\N', '\n')
+            .replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\'))
+
+
+def _unfolded(lines):
+    """Content lines of an iCalendar stream with RFC 5545 folding undone."""
+    current, start = None, 0
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = line, number
+    if current is not None:
+        yield start, current
+
+
+def _ics_datetime(params, value):
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        day = datetime.datetime.strptime(value, '%Y%m%d')
+        return timezone.make_aware(day)
+    if value.endswith('Z'):
+        return datetime.datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=datetime.timezone.utc)
+    moment = datetime.datetime.strptime(value, '%Y%m%dT%H%M%S')
+    if 'TZID' in params:
+        try:
+            return moment.replace(tzinfo=zoneinfo.ZoneInfo(params['TZID']))
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            raise RowError(f"Unknown time zone {params['TZID']}")
+    return timezone.make_aware(moment)
+
+
+def parse_ics(lines):
+    event = None
+    for number, line in _unfolded(lines):
+        name, _, value = line.partition(':')
+        name, *raw_params = name.split(';')
+        name = name.upper()
+        params = dict(param.partition('=')[::2] for param in raw_params)
+
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            event = {'line': number}
+        elif event is None:
+            continue
+        elif name == 'END' and value.upper() == 'VEVENT':
+            line_number = event.pop('line')
+            yield line_number, event
+            event = None
+        elif name in ('DTSTART', 'DTEND'):
+            try:
+                event['start_date' if name == 'DTSTART' else 'end_date'] = _ics_datetime(params, value)
+            except ValueError as e:
+                event['error'] = f"Invalid {name}: {e}"
+        elif name == 'STATUS':
+            event['status'] = ICS_STATUSES.get(value.upper(), 'published')
+        elif name == 'CATEGORIES':
+            event['category'] = _unescape(value).split(',')[0].strip()
+        elif name in ICS_PROPERTIES:
+            event[ICS_PROPERTIES[name]] = value if name == 'RRULE' else _unescape(value)
+
+
+# Importing
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+    def __str__(self):
+        return f"{self.created} events imported, {len(self.errors)} rows rejected"
+
+
+class EventImporter:
+    """
+    Validates parsed rows and inserts them with bulk_create, one transaction
+    per chunk. Categories are resolved through a name map loaded once (new
+    names are created on first sight) and organizers through a username map
+    filled with one query per chunk. A failing chunk is reported and skipped
+    without undoing the chunks before it.
+
+    bulk_create bypasses Event.save() and its signals, so the importer does
+    their work itself: it fills in campus and recurrence_end per row, and
+    refreshes the facet index, calendar feeds and reminders once at the end.
+    """
+
+    def __init__(self, default_organizer=None, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False):
+        self.default_organizer = default_organizer
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.report = ImportReport()
+        self.categories = {name.casefold(): pk for pk, name in EventCategory.objects.values_list('id', 'name')}
+        self.organizers = {}
+        self.touched_categories = set()
+        self.touched_campuses = set()
+
+    def run(self, rows):
+        chunk = []
+        try:
+            for line, row in rows:
+                chunk.append((line, row))
+                if len(chunk) >= self.chunk_size:
+                    self._import_chunk(chunk)
+                    chunk = []
+        except RowError as e:
+            self.report.error(None, str(e))
+        if chunk:
+            self._import_chunk(chunk)
+        if self.report.created:
+            self._refresh_derived_data()
+        return self.report
+
+    def _import_chunk(self, chunk):
+        self._load_organizers({row['organizer'] for _, row in chunk if row.get('organizer')})
+        events = []
+        for line, row in chunk:
+            try:
+                events.append(self._build_event(row))
+            except RowError as e:
+                self.report.error(line, str(e))
+        if self.dry_run or not events:
+            return
+        try:
+            with transaction.atomic():
+                Event.objects.bulk_create(events)
+        except DatabaseError as e:
+            first, last = chunk[0][0], chunk[-1][0]
+            self.report.error(first, f"Rows {first}-{last} were not imported: {e}")
+            return
+        self.report.created += len(events)
+
+    def _load_organizers(self, usernames):
+        missing = usernames - self.organizers.keys()
+        if missing:
+            self.organizers.update(
+                Profile.objects.filter(user__username__in=missing).values_list('user__username', 'id')
+            )
+
+    def _category_id(self, name):
+        if not name:
+            return None
+        key = name.casefold()
+        if key not in self.categories:
+            if self.dry_run:
+                return None
+            self.categories[key] = EventCategory.objects.create(name=name[:100]).pk
+        return self.categories[key]
+
+    def _build_event(self, row):
+        if row.get('error'):
+            raise RowError(row['error'])
+        title = row.get('title', '').strip()
+        if not title:
+            raise RowError("Title is required")
+        if len(title) > 200:
+            raise RowError("Title is longer than 200 characters")
+
+        start, end = self._datetime(row, 'start_date'), self._datetime(row, 'end_date')
+        if start >= end:
+            raise RowError("Start date must be before end date")
+
+        organizer_id = self._organizer_id(row.get('organizer'))
+        event = Event(
+            title=title,
+            description=row.get('description') or '',
+            start_date=start,
+            end_date=end,
+            location=(row.get('location') or '')[:200] or None,
+            category_id=self._category_id(row.get('category')),
+            organizer_id=organizer_id,
+            campus_id=organizer_id,
+            event_type=self._choice(row, 'event_type', Event.EVENT_TYPE_CHOICES, 'physical'),
+            status=self._choice(row, 'status', Event.STATUS_CHOICES, 'published'),
+            is_public=self._boolean(row.get('is_public'), default=True),
+            max_participants=self._positive_int(row.get('max_participants')),
+            recurrence_rule=row.get('recurrence_rule') or '',
+        )
+        self.touched_categories.add(event.category_id)
+        self.touched_campuses.add(organizer_id)
+        if event.recurrence_rule:
+            try:
+                event.recurrence_end = recurrence.series_end(event)
+            except (ValueError, TypeError) as e:
+                raise RowError(f"Invalid recurrence rule: {e}")
+        return event
+
+    def _datetime(self, row, field):
+        value = row.get(field)
+        if isinstance(value, datetime.datetime):
+            return value
+        if not value:
+            raise RowError(f"{field} is required")
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise RowError(f"Invalid {field}: {value!r}")
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+    def _organizer_id(self, username):
+        if username:
+            if username not in self.organizers:
+                raise RowError(f"Unknown organizer {username!r}")
+            return self.organizers[username]
+        if self.default_organizer is None:
+            raise RowError("No organizer given and no default organizer set")
+        return self.default_organizer.pk
+
+    def _choice(self, row, field, choices, default):
+        value = (row.get(field) or '').strip().lower()
+        if not value:
+            return default
+        if value not in dict(choices):
+            raise RowError(f"Invalid {field}: {value!r}")
+        return value
+
+    def _boolean(self, value, default):
+        if value in (None, ''):
+            return default
+        return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+    def _positive_int(self, value):
+        if value in (None, ''):
+            return None
+        try:
+            number = int(value)
+        except ValueError:
+            raise RowError(f"Invalid max_participants: {value!r}")
+        if number < 0:
+            raise RowError("max_participants cannot be negative")
+        return number
+
+    def _refresh_derived_data(self):
+        EventFacetIndex.invalidate()
+        campuses = Profile.objects.filter(id__in=self.touched_campuses).exclude(
+            campus__isnull=True
+        ).values_list('campus', flat=True)
+        ics.touch_feeds(
+            ics.EVENTS_FEED,
+            *(ics.category_feed(pk) for pk in self.touched_categories),
+            *(ics.campus_feed(campus) for campus in campuses),
+        )
+        schedule_missing_reminders()
+
+
+def import_events(lines, file_format, **options):
+    """Import events from an iterable of text lines in ``file_format``."""
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format {file_format!r}")
+    rows = parse_csv(lines) if file_format == 'csv' else parse_ics(lines)
+    return EventImporter(**options).run(rows)
@@ -0,0 +1,49 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from events.importer import IMPORT_CHUNK_SIZE, IMPORT_FORMATS, import_events
+from profiles.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Import events from a CSV or ICS file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or ICS file to import')
+        parser.add_argument(
+            '--format', choices=IMPORT_FORMATS,
+            help='File format (defaults to the file extension)'
+        )
+        parser.add_argument(
+            '--organizer',
+            help='Username used as organizer for rows that do not name one'
+        )
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Validate the file without creating anything'
+        )
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError('Unknown file format; pass --format csv or --format ics')
+
+        organizer = None
+        if options['organizer']:
+            organizer = Profile.objects.filter(user__username=options['organizer']).first()
+            if organizer is None:
+                raise CommandError(f"No user named {options['organizer']!r}")
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+            report = import_events(
+                lines, file_format,
+                default_organizer=organizer,
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run'],
+            )
+
+        for line, message in report.errors:
+            self.stderr.write(f'Line {line}: {message}' if line else message)
+        self.stdout.write(self.style.SUCCESS(str(report)))
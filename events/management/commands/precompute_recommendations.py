@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from events.recommendations import precompute_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Precompute the "Events for you" recommendations of every user (run nightly)'
+
+    def handle(self, *args, **options):
+        stored = precompute_recommendations()
+        self.stdout.write(self.style.SUCCESS(f'Stored recommendations for {stored} users'))
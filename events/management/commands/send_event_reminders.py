@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.reminders import REMINDER_BATCH_SIZE, schedule_missing_reminders, send_all_due_reminders
+
+
+class Command(BaseCommand):
+    help = 'Send event reminders that are due'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=REMINDER_BATCH_SIZE,
+            help='Number of reminders claimed per batch'
+        )
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running and check the queue every INTERVAL seconds'
+        )
+        parser.add_argument(
+            '--schedule-missing', action='store_true',
+            help='First create reminders for upcoming events that have none'
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule_missing']:
+            created = schedule_missing_reminders()
+            self.stdout.write(self.style.SUCCESS(f'Scheduled {created} reminders'))
+
+        while True:
+            handled = send_all_due_reminders(batch_size=options['batch_size'])
+            if handled:
+                self.stdout.write(self.style.SUCCESS(f'Sent {handled} reminders'))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -5,6 +5,7 @@ from django.core.exceptions import ValidationError
 from profiles.models import Profile  # Use the Profile model from profiles app
 from django.utils.translation import gettext_lazy as _
 from django.db.models import Max
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from django.db import transaction
 
@@ -18,7 +19,44 @@ class EventCategory(models.Model):
     def __str__(self):
         return self.name
 
-class EventManager(models.Manager):
+def count_subquery(queryset, outer_field='event'):
+    """
+    Correlated COUNT(*) over ``queryset`` per outer row. Unlike Count() over a
+    join, several of these can be combined without multiplying rows.
+    """
+    counts = queryset.filter(**{outer_field: models.OuterRef('pk')}).order_by().values(
+        outer_field
+    ).annotate(total=models.Count('pk')).values('total')
+    return Coalesce(models.Subquery(counts, output_field=models.IntegerField()), 0)
+
+
+class EventQuerySet(models.QuerySet):
+    def with_registration_counts(self):
+        """Annotate registered and waitlisted head counts in the same query."""
+        return self.annotate(
+            registered_count=count_subquery(EventRegistration.objects.filter(status='registered')),
+            waitlist_count=count_subquery(EventRegistration.objects.filter(status='waitlist')),
+        )
+
+    def with_comment_counts(self):
+        return self.annotate(comments_count=count_subquery(Comment.objects.all()))
+
+    def with_viewer_registration(self, profile):
+        """Annotate whether ``profile`` holds an active registration for each event."""
+        if profile is None:
+            return self.annotate(is_registered=models.Value(False, output_field=models.BooleanField()))
+        return self.annotate(
+            is_registered=models.Exists(
+                EventRegistration.objects.filter(
+                    event=models.OuterRef('pk'),
+                    participant=profile,
+                    status__in=['registered', 'waitlist']
+                )
+            )
+        )
+
+
+class EventManager(models.Manager.from_queryset(EventQuerySet)):
     def with_status(self):
         now = timezone.now()
         return self.annotate(
@@ -66,12 +104,54 @@ class Event(models.Model):
     # For text-based events
     content = models.TextField(blank=True, null=True, help_text="Content for text-based events")
     attachments = models.FileField(upload_to='event_attachments/', null=True, blank=True)
+
+    # Recurring events: the series row holds the rule and is its own first
+    # occurrence. Later dates are expanded on demand (see recurrence.py) and
+    # only stored, as rows pointing at the series, once someone registers or
+    # comments on them or the organizer overrides or cancels a date.
+    recurrence_rule = models.CharField(
+        max_length=255, blank=True, default='',
+        help_text="RRULE for recurring events, e.g. FREQ=WEEKLY;COUNT=12"
+    )
+    recurrence_end = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        help_text="End of the last occurrence; empty for series without an end"
+    )
+    series = models.ForeignKey(
+        'self', on_delete=models.CASCADE, null=True, blank=True, related_name='occurrences'
+    )
+    occurrence_start = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Start of the series date this event stands for"
+    )
     
     objects = EventManager()
 
+    class Meta:
+        indexes = [
+            # Calendar window and status filters range-scan on the dates
+            models.Index(fields=['is_public', 'status', 'start_date']),
+            models.Index(fields=['end_date']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['series', 'occurrence_start'],
+                name='unique_series_occurrence'
+            )
+        ]
+
+    @property
+    def is_recurring(self):
+        return bool(self.recurrence_rule)
+
     def save(self, *args, **kwargs):
         if not self.campus and self.organizer:
             self.campus = self.organizer
+        if self.recurrence_rule:
+            from .recurrence import series_end
+            self.recurrence_end = series_end(self)
+        else:
+            self.recurrence_end = None
         super().save(*args, **kwargs)
     @property
     def spots_left(self):
@@ -246,6 +326,58 @@ class EventRegistration(models.Model):
                 return True
             return False
 
+
+class EventReminder(models.Model):
+    """
+    One scheduled reminder for an event, e.g. "24 hours before start".
+
+    Unsent reminders form a queue ordered by ``due_at``; the sender pulls due
+    rows in batches and stamps ``sent_at`` when it claims them, so a reminder
+    is delivered at most once however often the sender runs.
+    """
+    KIND_CHOICES = [
+        ('day', '24 hours before'),
+        ('hour', '1 hour before'),
+    ]
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='reminders')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    due_at = models.DateTimeField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'kind'], name='unique_event_reminder')
+        ]
+        indexes = [
+            # The due queue: only unsent reminders are indexed
+            models.Index(
+                fields=['due_at'],
+                condition=models.Q(sent_at__isnull=True),
+                name='event_reminder_due_queue'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event} ({self.get_kind_display()})"
+
+
+class CommentQuerySet(models.QuerySet):
+    def with_like_state(self, profile=None):
+        """
+        Annotate ``likes_total`` and ``viewer_liked`` so a page of comments
+        needs no per-comment like queries.
+        """
+        queryset = self.annotate(likes_total=count_subquery(CommentLike.objects.all(), 'comment'))
+        if profile is None:
+            return queryset.annotate(viewer_liked=models.Value(False, output_field=models.BooleanField()))
+        return queryset.annotate(
+            viewer_liked=models.Exists(
+                CommentLike.objects.filter(comment=models.OuterRef('pk'), user=profile)
+            )
+        )
+
+
 class Comment(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='user_comments')  # Profile is used here
@@ -255,8 +387,14 @@ class Comment(models.Model):
     likes = models.ManyToManyField(Profile, through='CommentLike', related_name='liked_comments')  # Profile is used here
     is_edited = models.BooleanField(default=False)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['created_at']  # Order comments by creation time
+        indexes = [
+            # Serves keyset pagination of an event's comments
+            models.Index(fields=['event', '-created_at', '-id']),
+        ]
 
     def save(self, *args, **kwargs):
         if self.pk:  # Mark as edited if it's an update
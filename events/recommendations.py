@@ -0,0 +1,186 @@
+# events/recommendations.py
+import heapq
+import math
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from profiles.models import Profile, UserFollow
+
+from .models import Event, EventRegistration, count_subquery
+
+RECOMMENDATIONS_PER_USER = 10
+# Lists are rebuilt nightly; keep them a while longer so a late run leaves no gap
+RECOMMENDATIONS_TIMEOUT = 36 * 60 * 60
+CACHE_WRITE_CHUNK = 500
+DEFAULT_KEY = 'events:recommendations:default'
+
+# Score contributed by each signal; category affinity is scaled by the share
+# of the user's past registrations in that category
+WEIGHTS = {
+    'following': 3.0,
+    'category': 2.5,
+    'campus': 2.0,
+    'course': 1.5,
+}
+ACTIVE_STATUSES = ('registered', 'waitlist')
+
+
+def recommendations_key(profile_id):
+    return f'events:recommendations:{profile_id}'
+
+
+def candidate_events(now):
+    """Upcoming public events that can be recommended, with their attendance."""
+    return Event.objects.filter(
+        start_date__gt=now,
+        is_public=True,
+        series__isnull=True,
+    ).exclude(status='canceled').annotate(
+        registered_total=count_subquery(EventRegistration.objects.filter(status='registered')),
+    ).values(
+        'id', 'title', 'start_date', 'location', 'category__name', 'category_id',
+        'campus__campus', 'organizer_id', 'organizer__course', 'registered_total',
+    )
+
+
+def _compact(event):
+    """The part of an event the widget renders, so it never has to query."""
+    return {
+        'id': event['id'],
+        'title': event['title'],
+        'start_date': event['start_date'],
+        'location': event['location'],
+        'category': event['category__name'],
+    }
+
+
+class RecommendationBuilder:
+    """
+    Scores every candidate event for every profile in one pass.
+
+    All inputs are loaded up front with a handful of grouped queries and the
+    candidates are indexed by campus, organizer course, organizer and
+    category. A profile is then scored by walking only the index entries
+    matching its own signals, so the cost per profile is the number of
+    events it could plausibly want rather than the number of events.
+    """
+
+    def __init__(self, now=None):
+        self.now = now or timezone.now()
+        self.events = list(candidate_events(self.now))
+        self.index = {signal: defaultdict(list) for signal in WEIGHTS}
+        self.baseline = []
+        for position, event in enumerate(self.events):
+            if event['campus__campus']:
+                self.index['campus'][event['campus__campus']].append(position)
+            if event['organizer__course']:
+                self.index['course'][event['organizer__course']].append(position)
+            self.index['following'][event['organizer_id']].append(position)
+            if event['category_id']:
+                self.index['category'][event['category_id']].append(position)
+            # Popular and soon events win ties between otherwise equal matches
+            days_away = (event['start_date'] - self.now).total_seconds() / 86400
+            self.baseline.append(0.1 * math.log1p(event['registered_total']) + 0.1 / (1 + days_away))
+
+        event_ids = [event['id'] for event in self.events]
+        self.following = defaultdict(list)
+        for follower_id, following_id in UserFollow.objects.filter(
+            following_id__in=self.index['following']
+        ).values_list('follower_id', 'following_id').iterator():
+            self.following[follower_id].append(following_id)
+
+        self.affinity = defaultdict(dict)
+        history = EventRegistration.objects.filter(
+            status__in=ACTIVE_STATUSES, event__category__isnull=False
+        ).values_list('participant_id', 'event__category_id').annotate(total=Count('id')).order_by()
+        for profile_id, category_id, total in history.iterator():
+            self.affinity[profile_id][category_id] = total
+
+        self.registered = defaultdict(set)
+        for profile_id, event_id in EventRegistration.objects.filter(
+            event_id__in=event_ids, status__in=ACTIVE_STATUSES
+        ).values_list('participant_id', 'event_id').iterator():
+            self.registered[profile_id].add(event_id)
+
+    def score(self, profile_id, campus, course):
+        """Top events for one profile as [(score, position)], best first."""
+        scores = defaultdict(float)
+        if campus:
+            for position in self.index['campus'].get(campus, ()):
+                scores[position] += WEIGHTS['campus']
+        if course:
+            for position in self.index['course'].get(course, ()):
+                scores[position] += WEIGHTS['course']
+        for organizer_id in self.following.get(profile_id, ()):
+            for position in self.index['following'].get(organizer_id, ()):
+                scores[position] += WEIGHTS['following']
+        categories = self.affinity.get(profile_id, {})
+        registrations = sum(categories.values())
+        for category_id, total in categories.items():
+            for position in self.index['category'].get(category_id, ()):
+                scores[position] += WEIGHTS['category'] * total / registrations
+
+        registered = self.registered.get(profile_id, ())
+        return heapq.nlargest(
+            RECOMMENDATIONS_PER_USER,
+            ((score + self.baseline[position], position) for position, score in scores.items()
+             if self.events[position]['id'] not in registered
+             and self.events[position]['organizer_id'] != profile_id),
+        )
+
+    def default(self):
+        """Fallback list for profiles without any signal: the most popular events."""
+        best = heapq.nlargest(RECOMMENDATIONS_PER_USER, range(len(self.events)),
+                              key=self.baseline.__getitem__)
+        return [_compact(self.events[position]) for position in best]
+
+    def build(self):
+        """Yield (profile_id, ranked compact events) for every profile with a match."""
+        profiles = Profile.objects.values_list('id', 'campus', 'course')
+        for profile_id, campus, course in profiles.iterator(chunk_size=2000):
+            ranked = self.score(profile_id, campus, course)
+            if ranked:
+                yield profile_id, [_compact(self.events[position]) for _, position in ranked]
+
+
+def precompute_recommendations(now=None):
+    """
+    Rebuild and cache the recommendation list of every user. Meant to run
+    nightly (see the precompute_recommendations command). Returns the number
+    of personal lists stored.
+    """
+    builder = RecommendationBuilder(now)
+    cache.set(DEFAULT_KEY, builder.default(), RECOMMENDATIONS_TIMEOUT)
+
+    stored = 0
+    pending = {}
+    for profile_id, events in builder.build():
+        pending[recommendations_key(profile_id)] = events
+        if len(pending) >= CACHE_WRITE_CHUNK:
+            cache.set_many(pending, RECOMMENDATIONS_TIMEOUT)
+            stored += len(pending)
+            pending = {}
+    if pending:
+        cache.set_many(pending, RECOMMENDATIONS_TIMEOUT)
+        stored += len(pending)
+    return stored
+
+
+def get_recommendations(profile):
+    """Cached recommendations for ``profile``; one cache round trip, no queries."""
+    key = recommendations_key(profile.pk)
+    cached = cache.get_many([key, DEFAULT_KEY])
+    events = cached.get(key, cached.get(DEFAULT_KEY, []))
+    now = timezone.now()
+    return [event for event in events if event['start_date'] > now]
+
+
+def discard_recommendation(profile_id, event_id):
+    """Drop an event from a user's cached list, e.g. once they registered for it."""
+    key = recommendations_key(profile_id)
+    events = cache.get(key)
+    if events and any(event['id'] == event_id for event in events):
+        cache.set(key, [event for event in events if event['id'] != event_id], RECOMMENDATIONS_TIMEOUT)
@@ -0,0 +1,193 @@
+# events/recurrence.py
+import datetime
+import itertools
+
+from dateutil import rrule
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Event
+
+# Series longer than this are treated as open ended when computing their end
+MAX_SERIES_LENGTH = 1000
+
+# Fields an occurrence inherits from its series when it is materialized
+INHERITED_FIELDS = (
+    'category', 'title', 'description', 'event_type', 'location', 'image',
+    'max_participants', 'is_public', 'campus', 'organizer', 'content',
+    'attachments', 'status',
+)
+
+
+def parse_rule(rule, start):
+    """
+    dateutil rrule for an RRULE string starting at ``start``. Dates are
+    expanded in local time so a weekly 10:00 meeting stays at 10:00.
+    Raises ValueError for an invalid rule.
+    """
+    return rrule.rrulestr(rule, dtstart=timezone.localtime(start))
+
+
+def series_rule(series):
+    return parse_rule(series.recurrence_rule, series.start_date)
+
+
+def series_end(series):
+    """End of the last occurrence of ``series``, or None if it never ends."""
+    dates = list(itertools.islice(series_rule(series), MAX_SERIES_LENGTH + 1))
+    if not dates or len(dates) > MAX_SERIES_LENGTH:
+        return None
+    return dates[-1] + (series.end_date - series.start_date)
+
+
+def first_date(series):
+    # rrule drops microseconds from its start date, so compare without them
+    return series.start_date.replace(microsecond=0)
+
+
+def occurrence_key(series_id, start):
+    return f'{series_id}@{int(start.timestamp())}'
+
+
+class Occurrence:
+    """
+    One date of a recurring event. ``event`` is the stored row backing it:
+    the series itself for the first date, a materialized override for dates
+    someone registered for or commented on, or None for dates that only
+    exist in the rule.
+    """
+
+    def __init__(self, series, start, event=None):
+        self.series = series
+        self.start = start
+        self.event = event
+
+    @property
+    def source(self):
+        return self.event or self.series
+
+    @property
+    def is_materialized(self):
+        return self.event is not None
+
+    @property
+    def key(self):
+        if self.event is not None:
+            return str(self.event.pk)
+        return occurrence_key(self.series.pk, self.start)
+
+    @property
+    def start_date(self):
+        if self.event is not None:
+            return self.event.start_date
+        return self.start
+
+    @property
+    def end_date(self):
+        if self.event is not None:
+            return self.event.end_date
+        return self.start + (self.series.end_date - self.series.start_date)
+
+    @property
+    def title(self):
+        return self.source.title
+
+    def __getattr__(self, name):
+        # Everything else (location, category, ...) reads through to the backing row
+        if name.startswith('_') or name in ('series', 'event'):
+            raise AttributeError(name)
+        return getattr(self.source, name)
+
+
+def series_in_window(start, end):
+    """Series that can have an occurrence overlapping [start, end)."""
+    return Event.objects.exclude(recurrence_rule='').filter(
+        series__isnull=True,
+        start_date__lt=end,
+    ).filter(Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=start))
+
+
+def expand(series_list, start, end):
+    """
+    Occurrences of ``series_list`` overlapping [start, end), sorted by start.
+
+    Dates are generated from each rule in memory; stored overrides for the
+    window are fetched with one query and replace the generated dates they
+    stand for. Cancelled overrides act as exceptions and are dropped.
+    """
+    series_list = list(series_list)
+    if not series_list:
+        return []
+
+    longest = max(s.end_date - s.start_date for s in series_list)
+    overrides = {}
+    for override in Event.objects.filter(series__in=series_list).filter(
+        Q(occurrence_start__gte=start - longest, occurrence_start__lt=end)
+        | Q(start_date__lt=end, end_date__gte=start)
+    ):
+        overrides[(override.series_id, override.occurrence_start)] = override
+
+    occurrences = []
+    for series in series_list:
+        duration = series.end_date - series.start_date
+        for date in series_rule(series).between(start - duration, end, inc=True):
+            if date + duration <= start:
+                continue
+            if date == first_date(series):
+                occurrence = Occurrence(series, date, series)
+            else:
+                occurrence = Occurrence(series, date, overrides.pop((series.pk, date), None))
+            if occurrence.source.status == 'canceled':
+                continue
+            # An override may have been moved away from its original date
+            if occurrence.start_date < end and occurrence.end_date > start:
+                occurrences.append(occurrence)
+
+    # Overrides moved into the window from a date outside it
+    for (series_id, date), override in overrides.items():
+        if override.status != 'canceled' and override.start_date < end and override.end_date > start:
+            series = next(s for s in series_list if s.pk == series_id)
+            occurrences.append(Occurrence(series, date, override))
+
+    return sorted(occurrences, key=lambda occurrence: occurrence.start_date)
+
+
+def occurrence_at(series, timestamp):
+    """
+    The occurrence of ``series`` starting at the POSIX ``timestamp``, or None
+    if the rule has no date there.
+    """
+    start = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+    date = series_rule(series).after(timezone.localtime(start), inc=True)
+    if date is None or date != start:
+        return None
+    if date == first_date(series):
+        return Occurrence(series, date, series)
+    override = Event.objects.filter(series=series, occurrence_start=date).first()
+    return Occurrence(series, date, override)
+
+
+def materialize(occurrence):
+    """
+    Store ``occurrence`` as its own Event so it can hold registrations and
+    comments. Safe to call concurrently: the (series, occurrence_start)
+    unique constraint makes every caller end up with the same row.
+    """
+    if occurrence.event is not None:
+        return occurrence.event
+
+    series = occurrence.series
+    defaults = {field: getattr(series, field) for field in INHERITED_FIELDS}
+    defaults.update(
+        start_date=occurrence.start,
+        end_date=occurrence.end_date,
+    )
+    with transaction.atomic():
+        event, created = Event.objects.get_or_create(
+            series=series,
+            occurrence_start=occurrence.start,
+            defaults=defaults,
+        )
+    occurrence.event = event
+    return event
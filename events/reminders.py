@@ -0,0 +1,185 @@
+# events/reminders.py
+import datetime
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from notifications.models import Notification
+
+from .models import Event, EventRegistration, EventReminder
+
+logger = logging.getLogger(__name__)
+
+# How long before the start of an event each kind of reminder goes out
+REMINDER_OFFSETS = {
+    'day': datetime.timedelta(hours=24),
+    'hour': datetime.timedelta(hours=1),
+}
+REMINDER_BATCH_SIZE = 100
+REGISTRATION_CHUNK_SIZE = 2000
+EMAIL_CHUNK_SIZE = 500
+
+
+# Scheduling
+
+def schedule_reminders(event):
+    """
+    Create the reminders of ``event``, or move them after its start changed.
+    Reminders whose new due time still lies ahead are re-armed, so moving an
+    event reminds its registrants of the new date.
+    """
+    reschedule_reminders([event])
+
+
+def reschedule_reminders(events):
+    """schedule_reminders for many events with one read and bulk writes."""
+    now = timezone.now()
+    existing = {
+        (reminder.event_id, reminder.kind): reminder
+        for reminder in EventReminder.objects.filter(event__in=events)
+    }
+    new, changed = [], []
+    for event in events:
+        for kind, offset in REMINDER_OFFSETS.items():
+            due_at = event.start_date - offset
+            reminder = existing.get((event.pk, kind))
+            if reminder is None:
+                if event.start_date > now:
+                    new.append(EventReminder(event=event, kind=kind, due_at=due_at))
+            elif reminder.due_at != due_at:
+                reminder.due_at = due_at
+                if due_at > now:
+                    reminder.sent_at = None
+                changed.append(reminder)
+    EventReminder.objects.bulk_create(new, ignore_conflicts=True)
+    EventReminder.objects.bulk_update(changed, ['due_at', 'sent_at'])
+
+
+def schedule_missing_reminders():
+    """Create reminders for upcoming events that have none, e.g. after a deploy."""
+    events = Event.objects.filter(start_date__gt=timezone.now()).exclude(status='canceled').filter(
+        ~Exists(EventReminder.objects.filter(event=OuterRef('pk')))
+    ).values_list('pk', 'start_date')
+    reminders = [
+        EventReminder(event_id=event_id, kind=kind, due_at=start_date - offset)
+        for event_id, start_date in events.iterator()
+        for kind, offset in REMINDER_OFFSETS.items()
+    ]
+    EventReminder.objects.bulk_create(reminders, batch_size=1000, ignore_conflicts=True)
+    return len(reminders)
+
+
+# Delivery
+
+def _claim_batch(now, batch_size):
+    """
+    Mark up to ``batch_size`` due reminders as sent and return them.
+    Rows are locked with SKIP LOCKED where the database supports it, so
+    concurrent senders claim disjoint batches.
+    """
+    due = EventReminder.objects.select_for_update(skip_locked=True).filter(
+        sent_at__isnull=True, due_at__lte=now
+    ).order_by('due_at')
+    batch = list(due.values_list('pk', 'event_id', 'kind')[:batch_size])
+    EventReminder.objects.filter(pk__in=[pk for pk, _, _ in batch]).update(sent_at=now)
+    return batch
+
+
+def _recipients(event_ids):
+    """Registered attendees of ``event_ids`` grouped by event, read in one pass."""
+    registrations = EventRegistration.objects.filter(
+        event_id__in=event_ids, status='registered'
+    ).select_related('participant__user').only(
+        'event_id', 'name', 'email', 'participant__user__id', 'participant__user__email'
+    ).order_by()
+    recipients = defaultdict(list)
+    for registration in registrations.iterator(chunk_size=REGISTRATION_CHUNK_SIZE):
+        recipients[registration.event_id].append(registration)
+    return recipients
+
+
+def _reminder_email(event, registration, event_url, now):
+    context = {'event': event, 'name': registration.name, 'event_url': event_url, 'now': now}
+    html_message = render_to_string('events/emails/event_reminder.html', context)
+    message = mail.EmailMultiAlternatives(
+        subject=f"Reminder - {event.title}",
+        body=strip_tags(html_message),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[registration.email or registration.participant.user.email],
+    )
+    message.attach_alternative(html_message, 'text/html')
+    return message
+
+
+def send_emails(messages):
+    """Send ``messages`` over as few SMTP connections as possible."""
+    sent = 0
+    connection = mail.get_connection()
+    for start in range(0, len(messages), EMAIL_CHUNK_SIZE):
+        try:
+            sent += connection.send_messages(messages[start:start + EMAIL_CHUNK_SIZE]) or 0
+        except Exception as e:
+            logger.error(f"Error sending event reminder emails: {e}")
+    return sent
+
+
+def send_due_reminders(now=None, batch_size=REMINDER_BATCH_SIZE):
+    """
+    Deliver one batch of due reminders and return the number of reminders
+    handled (0 once the queue is drained).
+
+    Claiming the batch and creating its in-app notifications happen in one
+    transaction, so a crash either leaves the batch queued or fully notified
+    and a restart never notifies twice. Emails go out after the commit, which
+    makes them at most once. When several reminders of an event are due at
+    the same time (an event created shortly before it starts) attendees only
+    get one.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch = _claim_batch(now, batch_size)
+        if not batch:
+            return 0
+
+        event_ids = {event_id for _, event_id, _ in batch}
+        events = Event.objects.filter(
+            pk__in=event_ids, start_date__gt=now
+        ).exclude(status='canceled').in_bulk()
+        recipients = _recipients(events)
+
+        Notification.objects.bulk_create([
+            Notification(recipient_id=registration.participant.user.id, notification_type='reminder')
+            for registrations in recipients.values()
+            for registration in registrations
+        ], batch_size=1000)
+
+    messages = []
+    for event_id, registrations in recipients.items():
+        event = events[event_id]
+        event_url = settings.SITE_URL + reverse('events:event_detail', args=[event_id])
+        messages += [
+            _reminder_email(event, registration, event_url, now)
+            for registration in registrations
+            if registration.email or registration.participant.user.email
+        ]
+    sent = send_emails(messages)
+    logger.info(f"Sent {len(batch)} event reminders: {sent} emails for {len(events)} events")
+    return len(batch)
+
+
+def send_all_due_reminders(now=None, batch_size=REMINDER_BATCH_SIZE):
+    """Drain the due queue batch by batch. Returns the number of reminders handled."""
+    total = 0
+    while True:
+        handled = send_due_reminders(now, batch_size)
+        if not handled:
+            return total
+        total += handled
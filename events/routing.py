@@ -0,0 +1,6 @@
+from django.urls import re_path
+from . import consumers
+
+websocket_urlpatterns = [
+    re_path(r'ws/events/(?P<event_id>\d+)/status/$', consumers.EventStatusConsumer.as_asgi()),
+]
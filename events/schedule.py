@@ -0,0 +1,140 @@
+# events/schedule.py
+import heapq
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import ics
+from .models import EventRegistration
+
+SCHEDULE_CACHE_TIMEOUT = 60 * 60
+ACTIVE_STATUSES = ('registered', 'waitlist')
+
+
+class IntervalIndex:
+    """
+    Static interval tree over (start, end, item) triples.
+
+    The intervals are sorted by start and read as an implicit balanced binary
+    tree (the middle of every slice is its root); each root also stores the
+    latest end in its subtree. An overlap query skips every subtree ending
+    before the query starts and every right subtree starting after it ends,
+    so it costs O(log n + k) for k matches.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals, key=lambda interval: (interval[0], interval[1]))
+        self._max_end = [None] * len(self.intervals)
+        self._augment(0, len(self.intervals))
+
+    def _augment(self, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        ends = [self.intervals[mid][1], self._augment(lo, mid), self._augment(mid + 1, hi)]
+        self._max_end[mid] = max(end for end in ends if end is not None)
+        return self._max_end[mid]
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlapping(self, start, end):
+        """Intervals overlapping [start, end), ordered by start."""
+        found = []
+        self._search(0, len(self.intervals), start, end, found)
+        return found
+
+    def _search(self, lo, hi, start, end, found):
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self._max_end[mid] <= start:
+            return
+        self._search(lo, mid, start, end, found)
+        interval = self.intervals[mid]
+        if interval[0] < end:
+            if interval[1] > start:
+                found.append(interval)
+            self._search(mid + 1, hi, start, end, found)
+
+    def overlapping_pairs(self):
+        """Every pair of overlapping intervals, found with one sweep by start."""
+        pairs = []
+        active = []  # heap of (end, position) for intervals still open
+        for position, interval in enumerate(self.intervals):
+            while active and active[0][0] <= interval[0]:
+                heapq.heappop(active)
+            pairs.extend((self.intervals[other], interval) for _, other in sorted(active, key=lambda a: a[1]))
+            heapq.heappush(active, (interval[1], position))
+        return pairs
+
+
+def _schedule_key(profile_id):
+    # Registration changes bump the user feed and event edits the events feed
+    versions = ics.feed_versions(ics.user_feed(profile_id), ics.EVENTS_FEED)
+    return f'events:schedule:{profile_id}:' + '-'.join(str(version) for version in versions)
+
+
+def load_schedule(profile_id):
+    """Upcoming and ongoing active registrations of a profile, in one query."""
+    registrations = EventRegistration.objects.filter(
+        participant_id=profile_id,
+        status__in=ACTIVE_STATUSES,
+        event__end_date__gte=timezone.now(),
+    ).exclude(event__status='canceled').values(
+        'status', 'waitlist_position', 'event_id', 'event__title', 'event__start_date',
+        'event__end_date', 'event__location',
+    )
+    return IntervalIndex(
+        (registration['event__start_date'], registration['event__end_date'], {
+            'id': registration['event_id'],
+            'title': registration['event__title'],
+            'location': registration['event__location'],
+            'status': registration['status'],
+            'waitlist_position': registration['waitlist_position'],
+        })
+        for registration in registrations
+    )
+
+
+def get_schedule(profile_id):
+    """Cached interval index of a profile's schedule."""
+    key = _schedule_key(profile_id)
+    schedule = cache.get(key)
+    if schedule is None:
+        schedule = load_schedule(profile_id)
+        cache.set(key, schedule, SCHEDULE_CACHE_TIMEOUT)
+    return schedule
+
+
+def _describe(interval):
+    start, end, item = interval
+    return {**item, 'start': start.isoformat(), 'end': end.isoformat()}
+
+
+def find_conflicts(profile_id, event):
+    """Registered events of a profile that overlap ``event``."""
+    return [
+        _describe(interval)
+        for interval in get_schedule(profile_id).overlapping(event.start_date, event.end_date)
+        if interval[2]['id'] != event.pk
+    ]
+
+
+def build_agenda(profile_id):
+    """
+    The profile's agenda in start order, each entry listing the ids of the
+    events it clashes with, plus the clashing pairs themselves.
+    """
+    schedule = get_schedule(profile_id)
+    clashes = {}
+    conflicts = []
+    for first, second in schedule.overlapping_pairs():
+        clashes.setdefault(first[2]['id'], []).append(second[2]['id'])
+        clashes.setdefault(second[2]['id'], []).append(first[2]['id'])
+        conflicts.append([first[2]['id'], second[2]['id']])
+    agenda = [
+        {**_describe(interval), 'conflicts_with': clashes.get(interval[2]['id'], [])}
+        for interval in schedule.intervals
+    ]
+    return {'agenda': agenda, 'conflicts': conflicts}
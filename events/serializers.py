@@ -1,6 +1,7 @@
 # events/serializers.py
 from rest_framework import serializers
 from django.utils import timezone
+from core.api import SparseFieldsetSerializerMixin
 from .models import Event, EventCategory, EventRegistration, Comment
 
 
@@ -11,8 +12,23 @@ class EventCategorySerializer(serializers.ModelSerializer):
 
     
 
-# Update CommentSerializer to use ReplySerializer
-class CommentSerializer(serializers.ModelSerializer):
+class ProfileSummaryMixin:
+    """Serialize a Profile whose user was loaded with select_related."""
+
+    def profile_summary(self, profile):
+        return {
+            'id': profile.id,
+            'username': profile.user.username,
+            'avatar': profile.get_avatar_url()
+        }
+
+
+class CommentSerializer(SparseFieldsetSerializerMixin, ProfileSummaryMixin, serializers.ModelSerializer):
+    """
+    Reads ``likes_count`` and ``is_liked_by_user`` from queryset annotations
+    when they are present (see Comment.objects.with_like_state), falling back
+    to per-comment queries otherwise.
+    """
     user = serializers.SerializerMethodField()
     likes_count = serializers.SerializerMethodField()
     is_liked_by_user = serializers.SerializerMethodField()
@@ -21,28 +37,31 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ['id', 'content', 'user', 'created_at', 'updated_at',
-                 'likes_count', 'is_liked_by_user', 'replies', 'level',
-                 'is_edited', 'path']
-        read_only_fields = ['user', 'created_at', 'updated_at', 'path',
-                           'level', 'is_edited']
+                 'likes_count', 'is_liked_by_user', 'is_edited']
+        read_only_fields = ['user', 'created_at', 'updated_at', 'is_edited']
 
     def get_user(self, obj):
-        return {
-            'id': obj.user.id,
-            'username': obj.user.user.username,
-            'avatar': obj.user.avatar.url if obj.user.avatar else None
-        }
+        return self.profile_summary(obj.user)
 
     def get_likes_count(self, obj):
+        if hasattr(obj, 'likes_total'):
+            return obj.likes_total
         return obj.likes.count()
 
     def get_is_liked_by_user(self, obj):
+        if hasattr(obj, 'viewer_liked'):
+            return obj.viewer_liked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(id=request.user.profile.id).exists()
         return False
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsetSerializerMixin, ProfileSummaryMixin, serializers.ModelSerializer):
+    """
+    Expects the queryset built by EventViewSet.get_queryset: counts and the
+    viewer's registration are annotations, category/campus/organizer are
+    joined in, so serializing a page of events adds no queries.
+    """
     category = EventCategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=EventCategory.objects.all(),
@@ -51,9 +70,8 @@ class EventSerializer(serializers.ModelSerializer):
         required=False
     )
     campus = serializers.SerializerMethodField()
-    comments = CommentSerializer(many=True, read_only=True)
-    reactions_count = serializers.SerializerMethodField()
-    is_registered = serializers.SerializerMethodField()
+    reactions_count = serializers.IntegerField(source='comments_count', read_only=True, default=0)
+    is_registered = serializers.BooleanField(read_only=True, default=False)
     remaining_slots = serializers.SerializerMethodField()
     organizer_details = serializers.SerializerMethodField()
 
@@ -62,7 +80,7 @@ class EventSerializer(serializers.ModelSerializer):
         fields = ['id', 'category', 'category_id', 'title', 'description',
                  'event_type', 'start_date', 'end_date', 'location', 'image',
                  'max_participants', 'is_public', 'campus', 'content',
-                 'attachments', 'comments', 'reactions_count', 'is_registered',
+                 'attachments', 'reactions_count', 'is_registered',
                  'remaining_slots', 'organizer_details']
         read_only_fields = ['organizer', 'reactions_count', 'is_registered', 'campus']
     
@@ -70,32 +88,20 @@ class EventSerializer(serializers.ModelSerializer):
         if obj.campus:
             return {
                 'id': obj.campus.id,
-                'name': obj.campus.campus.name if hasattr(obj.campus, 'campus') else None
+                'name': obj.campus.campus
             }
         return None
-    
-  
-    def get_is_registered(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return EventRegistration.objects.filter(
-                event=obj,
-                participant=request.user.profile
-            ).exists()
-        return False
 
     def get_remaining_slots(self, obj):
         if obj.max_participants:
-            registered = EventRegistration.objects.filter(event=obj).count()
+            registered = getattr(obj, 'registered_count', None)
+            if registered is None:
+                registered = obj.registrations.filter(status='registered').count()
             return max(0, obj.max_participants - registered)
         return None
 
     def get_organizer_details(self, obj):
-        return {
-            'id': obj.organizer.id,
-            'username': obj.organizer.user.username,
-            'avatar': obj.organizer.avatar.url if obj.organizer.avatar else None
-        }
+        return self.profile_summary(obj.organizer)
 
     def validate(self, data):
         # Validate dates
@@ -135,6 +141,21 @@ class EventSerializer(serializers.ModelSerializer):
             validated_data['organizer'] = request.user.profile
         return super().create(validated_data)
 
+class EventDetailSerializer(EventSerializer):
+    """Event with its comments, used for single event responses."""
+    comments = CommentSerializer(many=True, read_only=True)
+
+    class Meta(EventSerializer.Meta):
+        fields = EventSerializer.Meta.fields + ['comments']
+
+class EventBulkItemSerializer(serializers.ModelSerializer):
+    """One entry of a bulk update, validated against the event it changes."""
+
+    class Meta:
+        model = Event
+        fields = ['title', 'description', 'start_date', 'end_date', 'location',
+                  'max_participants', 'is_public', 'event_type', 'content']
+
 class EventRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = EventRegistration
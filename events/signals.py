@@ -0,0 +1,188 @@
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core import versions as change_versions
+from profiles.models import Profile
+
+from . import ics, versions
+from .campus_index import campus_index
+from .facets import EventFacetIndex, event_campus
+from .models import Comment, Event, EventCategory, EventRegistration
+from .recommendations import discard_recommendation
+from .reminders import schedule_reminders
+from .status import refresh_event_status
+
+
+def _feeds_for(event):
+    feeds = [ics.EVENTS_FEED, ics.category_feed(event.category_id)]
+    campus = event_campus(event)
+    if campus:
+        feeds.append(ics.campus_feed(campus))
+    return feeds
+
+
+# Fields the facet cell, feed and reminder deltas below depend on
+TRACKED_FIELDS = {'campus', 'category', 'status', 'start_date', 'end_date', 'event_type', 'series'}
+
+
+@receiver(pre_save, sender=Event)
+def remember_previous_state(sender, instance, update_fields=None, **kwargs):
+    # Keep the pre-update row so post_save can tell what the update moved
+    instance._previous = None
+    if not instance.pk:
+        return
+    if update_fields is not None and not TRACKED_FIELDS & {
+        field.removesuffix('_id') for field in update_fields
+    }:
+        # Nothing the deltas read can change, so the row stands in for its old self
+        instance._previous = instance
+        return
+    instance._previous = Event.objects.filter(pk=instance.pk).select_related('campus').first()
+
+
+@receiver(post_save, sender=Event)
+def update_facet_index(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    if previous is instance:
+        return
+    if previous is not None:
+        EventFacetIndex.adjust(previous, -1)
+    EventFacetIndex.adjust(instance, 1)
+
+
+@receiver(post_delete, sender=Event)
+def remove_from_facet_index(sender, instance, **kwargs):
+    EventFacetIndex.adjust(instance, -1)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def touch_calendar_feeds(sender, instance, **kwargs):
+    feeds = _feeds_for(instance)
+    previous = getattr(instance, '_previous', None)
+    if previous is not None and previous is not instance:
+        feeds += _feeds_for(previous)
+    # Bumped after commit so a poll in between can't pair the old body with the new version
+    transaction.on_commit(lambda: ics.touch_feeds(*feeds))
+
+
+def _category_feeds(category):
+    """Feeds showing ``category``'s name: its own and those of its events' campuses."""
+    campuses = Event.objects.filter(category=category, campus__isnull=False).values_list(
+        'campus__campus', flat=True
+    ).distinct()
+    return [ics.EVENTS_FEED, ics.category_feed(category.pk),
+            *(ics.campus_feed(campus) for campus in campuses if campus)]
+
+
+@receiver(pre_delete, sender=EventCategory)
+def remember_category_feeds(sender, instance, **kwargs):
+    # Collected before the delete detaches the events from the category
+    instance._feeds = _category_feeds(instance)
+
+
+@receiver(post_save, sender=EventCategory)
+@receiver(post_delete, sender=EventCategory)
+def refresh_facet_labels(sender, instance, created=False, **kwargs):
+    EventFacetIndex.invalidate()
+    # Category names are part of every serialized event and feed entry
+    if created:
+        feeds = [ics.EVENTS_FEED]
+    else:
+        feeds = getattr(instance, '_feeds', None) or _category_feeds(instance)
+    transaction.on_commit(lambda: ics.touch_feeds(*feeds))
+
+
+@receiver(post_save, sender=EventRegistration)
+@receiver(post_delete, sender=EventRegistration)
+def push_registration_change(sender, instance, **kwargs):
+    # Rebuild once the change is committed so subscribers never see rolled back counts
+    event_id = instance.event_id
+    transaction.on_commit(lambda: refresh_event_status(event_id))
+    user_feed = ics.user_feed(instance.participant_id)
+    transaction.on_commit(lambda: ics.touch_feeds(user_feed))
+    transaction.on_commit(lambda: change_versions.touch(versions.REGISTRATIONS))
+
+
+@receiver(post_save, sender=Event)
+def push_capacity_change(sender, instance, created, **kwargs):
+    if not created:
+        event_id = instance.pk
+        transaction.on_commit(lambda: refresh_event_status(event_id))
+
+
+@receiver(post_save, sender=Event)
+def schedule_event_reminders(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    if created or previous is None or previous.start_date != instance.start_date:
+        schedule_reminders(instance)
+
+
+@receiver(post_save, sender=EventRegistration)
+def drop_registered_recommendation(sender, instance, **kwargs):
+    if instance.status in ('registered', 'waitlist'):
+        discard_recommendation(instance.participant_id, instance.event_id)
+
+
+@receiver(post_init, sender=Profile)
+def remember_indexed_campus(sender, instance, **kwargs):
+    # Remembered at load time so saves don't need a query to see what changed.
+    # Read from __dict__ so profiles loaded with only() don't fetch the column.
+    instance._indexed_campus = instance.__dict__.get('campus', DEFERRED)
+
+
+@receiver(pre_save, sender=Profile)
+def load_indexed_campus(sender, instance, update_fields=None, **kwargs):
+    # A profile loaded without its campus reads the stored one only when a save writes it
+    if instance.pk and instance._indexed_campus is DEFERRED and (
+        update_fields is None or 'campus' in update_fields
+    ):
+        instance._indexed_campus = Profile.objects.filter(pk=instance.pk).values_list(
+            'campus', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Profile)
+def update_campus_index(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'campus' not in update_fields:
+        return
+    # post_init saw the constructor's campus of a new profile, which was never indexed
+    previous = None if created else instance._indexed_campus
+    campus_index.change(previous, instance.campus)
+    if previous != instance.campus:
+        # Events list under their campus profile's campus, so they move between campus feeds
+        feeds = [ics.campus_feed(campus) for campus in (previous, instance.campus) if campus]
+        transaction.on_commit(lambda: ics.touch_feeds(*feeds))
+    instance._indexed_campus = instance.campus
+
+
+@receiver(post_delete, sender=Profile)
+def remove_from_campus_index(sender, instance, **kwargs):
+    if instance._indexed_campus is DEFERRED:
+        campus_index.invalidate()
+        return
+    campus_index.change(instance._indexed_campus, None)
+    if instance._indexed_campus:
+        feed = ics.campus_feed(instance._indexed_campus)
+        transaction.on_commit(lambda: ics.touch_feeds(feed))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_comment_versions(sender, instance, **kwargs):
+    names = (versions.COMMENTS, versions.event_comments(instance.event_id))
+    transaction.on_commit(lambda: change_versions.touch(*names))
+
+
+@receiver(m2m_changed, sender=Comment.likes.through)
+def touch_comment_like_versions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        event_ids = set(Comment.objects.filter(pk__in=pk_set or ()).values_list('event_id', flat=True))
+    else:
+        event_ids = {instance.event_id}
+    names = (versions.COMMENTS, *(versions.event_comments(pk) for pk in event_ids))
+    transaction.on_commit(lambda: change_versions.touch(*names))
@@ -0,0 +1,86 @@
+# events/status.py
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+EVENT_STATUS_TIMEOUT = 60 * 60
+
+
+def event_status_cache_key(event_id):
+    return f'event_status_{event_id}'
+
+
+def event_status_group(event_id):
+    return f'event_status_{event_id}'
+
+
+def _next_version(event_id):
+    key = f'event_status_version_{event_id}'
+    cache.add(key, 0, None)
+    return cache.incr(key)
+
+
+def build_event_status(event_id):
+    """
+    Compute the public status of an event with a single query.
+    Returns None if the event does not exist.
+    """
+    row = Event.objects.filter(pk=event_id).annotate(
+        registered_count=Count('registrations', filter=Q(registrations__status='registered')),
+        waitlist_count=Count('registrations', filter=Q(registrations__status='waitlist')),
+    ).values('max_participants', 'registered_count', 'waitlist_count').first()
+    if row is None:
+        return None
+
+    max_participants = row['max_participants']
+    registered_count = row['registered_count']
+    return {
+        'event_id': event_id,
+        'version': _next_version(event_id),
+        'total_spots': max_participants,
+        'spots_left': max(0, max_participants - registered_count) if max_participants else None,
+        'registered_count': registered_count,
+        'waitlist_count': row['waitlist_count'],
+        'is_full': bool(max_participants) and registered_count >= max_participants,
+    }
+
+
+def get_event_status(event_id):
+    """Cached status snapshot, rebuilt only when missing."""
+    snapshot = cache.get(event_status_cache_key(event_id))
+    if snapshot is None:
+        snapshot = build_event_status(event_id)
+        if snapshot is not None:
+            cache.set(event_status_cache_key(event_id), snapshot, EVENT_STATUS_TIMEOUT)
+    return snapshot
+
+
+def refresh_event_status(event_id):
+    """
+    Rebuild the snapshot after a change and push it to every browser
+    subscribed to the event's status group.
+    """
+    snapshot = build_event_status(event_id)
+    if snapshot is None:
+        cache.delete(event_status_cache_key(event_id))
+        return None
+    cache.set(event_status_cache_key(event_id), snapshot, EVENT_STATUS_TIMEOUT)
+
+    channel_layer = get_channel_layer()
+    if channel_layer is not None:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                event_status_group(event_id),
+                {'type': 'event_status', 'snapshot': snapshot}
+            )
+        except Exception:
+            # Clients fall back to polling event_status, so a push failure is not fatal
+            logger.warning("Could not push status of event %s", event_id, exc_info=True)
+    return snapshot
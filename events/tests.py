@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Comment, Event, EventCategory, EventRegistration
+
+
+class EventAPIQueryCountTests(TestCase):
+    """
+    The events API annotates counts and the viewer's registration in SQL
+    (see EventQuerySet), so its query count must not grow with the data.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organizer = User.objects.create_user('organizer', 'organizer@example.com', 'password')
+        cls.viewer = User.objects.create_user('viewer', 'viewer@example.com', 'password')
+        others = [
+            User.objects.create_user(f'attendee{i}', f'attendee{i}@example.com', 'password')
+            for i in range(3)
+        ]
+        categories = [EventCategory.objects.create(name=name) for name in ('Sports', 'Tech')]
+        start = timezone.now() + timedelta(days=1)
+        cls.events = [
+            Event.objects.create(
+                title=f'Event {i}', description='Description', organizer=cls.organizer.profile,
+                category=categories[i % 2], start_date=start + timedelta(hours=i),
+                end_date=start + timedelta(hours=i + 2), event_type='physical',
+                status='published', max_participants=10,
+            )
+            for i in range(100)
+        ]
+        for event in cls.events[:20]:
+            for user in [cls.viewer, *others]:
+                EventRegistration.objects.create(
+                    event=event, participant=user.profile, name=user.username, email=user.email
+                )
+            for user in others:
+                Comment.objects.create(event=event, user=user.profile, content='Comment')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.viewer)
+        # Load the session and user once so only the view's own queries are counted
+        self.client.get(reverse('events:event-list'), {'page_size': 1})
+
+    def test_list_query_count_is_constant(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('events:event-list'), {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 100)
+        registered = {event.pk for event in self.events[:20]}
+        for result in results:
+            self.assertEqual(result['is_registered'], result['id'] in registered)
+
+    def test_detail_query_count_is_constant(self):
+        event = self.events[0]
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('events:event-detail', args=[event.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_registered'])
+        self.assertEqual(len(response.json()['comments']), 3)
@@ -23,6 +23,9 @@ urlpatterns = [
     path('', views.event_list, name='event_list'),
     path('<int:event_id>/', views.event_detail, name='event_detail'),
     path('create/', views.create_event, name='create_event'),
+    path('<int:event_id>/occurrences/<int:timestamp>/', views.occurrence_detail, name='occurrence_detail'),
+    path('<int:event_id>/occurrences/<int:timestamp>/register/', views.occurrence_register, name='occurrence_register'),
+    path('<int:event_id>/occurrences/<int:timestamp>/comment/', views.occurrence_comment, name='occurrence_comment'),
     path('<int:event_id>/comment/', views.add_comment, name='add_comment'),
     path('comment/<int:comment_id>/like/', views.toggle_comment_like, name='toggle_comment_like'),
     path('<int:event_id>/delete/', views.delete_event, name='delete_event'),
@@ -40,9 +43,19 @@ urlpatterns = [
     
     # Optional additional URLs for event management
     path('event/<int:event_id>/attendees/', views.event_attendees, name='event_attendees'),
+    path('event/<int:event_id>/attendees/export.<str:export_format>', views.export_attendees, name='export_attendees'),
+    path('event/<int:event_id>/ticket.png', views.registration_ticket, name='registration_ticket'),
+    path('event/<int:event_id>/checkin/', views.event_checkin, name='event_checkin'),
 
     
+    # iCalendar feeds
+    path('calendar/my/<str:token>.ics', views.user_calendar_feed, name='user_calendar_feed'),
+    path('calendar/campus/<str:campus>.ics', views.campus_calendar_feed, name='campus_calendar_feed'),
+    path('calendar/category/<int:category_id>.ics', views.category_calendar_feed, name='category_calendar_feed'),
+
     # API-style endpoints for AJAX calls
+    path('api/calendar/', views.calendar_window, name='calendar_window'),
+    path('api/schedule/', views.my_schedule, name='my_schedule'),
     path('api/event/<int:event_id>/status/', views.event_status, name='event_status'),
     path('api/event/<int:event_id>/waitlist/', views.waitlist_position, name='waitlist_position'),
     
@@ -0,0 +1,12 @@
+# events/versions.py
+"""Change versions (see core.versions) that event data is tracked under."""
+from .ics import EVENTS_FEED
+
+# Bumped by every event save or delete, shared with the calendar feeds
+EVENTS = EVENTS_FEED
+REGISTRATIONS = 'registrations'
+COMMENTS = 'comments'
+
+
+def event_comments(event_id):
+    return f'comments:{event_id}'
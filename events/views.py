@@ -1,22 +1,26 @@
 import logging
 from notifications.bulk import notify_all_users
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.urls import reverse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, Http404
 from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Q
-from django.utils import timezone
 from django.core.files.storage import default_storage
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
 from profiles.models import Profile
-from .models import Event, EventRegistration, Comment
+from .models import Event, EventCategory, EventRegistration, Comment
 from .forms import EventForm, CommentForm, EventRegistrationForm
 from .serializers import  CommentSerializer
+from core.pagination import keyset_page
+from .campus_index import campus_index
+from .facets import FACETS, EventFacetIndex, browse_events
+from .status import get_event_status
+from . import calendar, exports, ics, recommendations, recurrence, schedule, tickets
+import datetime
 import json
-from django.core.paginator import EmptyPage, InvalidPage
 from django.template.loader import render_to_string
 from django.db.models import Count
 from django.utils.html import strip_tags
@@ -26,7 +30,6 @@ from django.core.exceptions import ValidationError
 from django.http import HttpResponseForbidden
 from django.conf import settings
 from django.db.models import Max
-from django.core.cache import cache
 import logging
 
 # Set up logging
@@ -36,41 +39,27 @@ logger = logging.getLogger(__name__)
 
 @login_required
 def event_list(request):
-    status_filter = request.GET.get('status')
-    campus_filter = request.GET.get('campus')
-
-    # Fetch all events and related data
-    events = Event.objects.all().order_by('-start_date').prefetch_related('comments')
-
-    # Apply status filter if present
-    if status_filter:
-        now = timezone.now()
-        if status_filter == 'upcoming':
-            events = events.filter(start_date__gte=now)
-        elif status_filter == 'ongoing':
-            events = events.filter(start_date__lte=now, end_date__gte=now)
-        elif status_filter == 'completed':
-            events = events.filter(end_date__lt=now)
-    
-    # Apply campus filter if present
-    if campus_filter:
-        events = events.filter(campus__campus=campus_filter)
+    filters = {facet: request.GET.get(facet) for facet in FACETS}
+
+    # Comment counts are annotated in SQL instead of counted per event
+    events = browse_events(filters)
 
-    # Get unique campus values for the filter form
-    campuses = Profile.objects.values_list('campus', flat=True).distinct()
+    # Facet options and their counts come from the cached facet index
+    facets = EventFacetIndex().facet_counts(filters)
 
     # Pagination setup
     paginator = Paginator(events, 12)  # Show 12 events per page
     page = request.GET.get('page')
     events = paginator.get_page(page)
 
-    # Add comments count for each event
-    for event in events:
-        event.comments_count = event.comments.count()
-
     context = {
         'events': events,
-        'campuses': campuses,
+        'facets': facets,
+        'campuses': [value for value, label, count in facets['campus']],
+        'active_filters': {facet: value for facet, value in filters.items() if value},
+        'calendar_feed_token': ics.user_feed_token(request.user.profile),
+        # Precomputed nightly, so this is a cache lookup rather than a query
+        'recommended_events': recommendations.get_recommendations(request.user.profile),
     }
 
     # If it's an HTMX request, return only the events partial
@@ -92,7 +81,7 @@ def event_detail(request, event_id):
         participant=user_profile,
         status__in=['registered', 'waitlist']
     ).first()
-    comments = event.comments.all()
+    comments, comments_next_cursor = comments_page(event, user_profile)
     comment_form = CommentForm()
     user_registered = registration is not None
     
@@ -106,16 +95,73 @@ def event_detail(request, event_id):
         'registration': registration,
         'comment_form': comment_form,
         'comments': comments,
+        'comments_next_cursor': comments_next_cursor,
         'form': EventRegistrationForm(initial={
             'name': request.user.get_full_name() or request.user.username,
             'email': request.user.email
         }),
         'spots_left': event.spots_left,  # Fixed
+        'schedule_conflicts': [] if user_registered else schedule.find_conflicts(user_profile.pk, event),
         'is_waitlist_open': event.is_waitlist_open if hasattr(event, 'is_waitlist_open') else True  # Fixed
     }
     return render(request, 'events/event_detail.html', context)
 
 
+def _get_occurrence(event_id, timestamp):
+    series = get_object_or_404(
+        Event.objects.exclude(recurrence_rule=''), id=event_id, series__isnull=True
+    )
+    occurrence = recurrence.occurrence_at(series, timestamp)
+    if occurrence is None:
+        raise Http404("This event does not take place at that time")
+    return occurrence
+
+
+@login_required
+def occurrence_detail(request, event_id, timestamp):
+    """
+    One date of a recurring event. Dates that haven't been stored yet are
+    shown from the series; registering or commenting stores them first.
+    """
+    occurrence = _get_occurrence(event_id, timestamp)
+    if occurrence.is_materialized:
+        return redirect('events:event_detail', event_id=occurrence.event.id)
+
+    context = {
+        'event': occurrence,
+        'occurrence_urls': {
+            'register': reverse('events:occurrence_register', args=[event_id, timestamp]),
+            'comment': reverse('events:occurrence_comment', args=[event_id, timestamp]),
+        },
+        'user_registered': False,
+        'registration': None,
+        'comment_form': CommentForm(),
+        'comments': [],
+        'comments_next_cursor': None,
+        'form': EventRegistrationForm(initial={
+            'name': request.user.get_full_name() or request.user.username,
+            'email': request.user.email
+        }),
+        'spots_left': occurrence.series.max_participants,
+        'is_waitlist_open': True
+    }
+    return render(request, 'events/event_detail.html', context)
+
+
+@login_required
+@require_POST
+def occurrence_register(request, event_id, timestamp):
+    event = recurrence.materialize(_get_occurrence(event_id, timestamp))
+    return register_for_event(request, event.id)
+
+
+@login_required
+@require_POST
+def occurrence_comment(request, event_id, timestamp):
+    event = recurrence.materialize(_get_occurrence(event_id, timestamp))
+    return add_comment(request, event.id)
+
+
 @login_required
 @transaction.atomic
 def create_event(request):
@@ -166,6 +212,8 @@ def add_comment(request, event_id):
 
             # Save the comment
             comment.save()
+            comment.likes_total = 0
+            comment.viewer_liked = False
 
             if is_ajax:
                 # Render the comment HTML
@@ -244,42 +292,45 @@ def delete_comment(request, comment_id):
             'message': 'An error occurred while deleting the comment'
         }, status=500)
 
-@login_required
-def load_more_comments(request, event_id):
-    event = get_object_or_404(Event, id=event_id)
-    page = int(request.GET.get('page', 1))
-    comments_per_page = 5
+COMMENTS_PER_PAGE = 5
+
 
+def comments_page(event, profile, cursor=None):
+    """
+    Keyset page of an event's comments, newest first, with like counts and
+    the viewer's like state annotated so rendering runs no extra queries.
+    """
     comments = Comment.objects.filter(
         event=event,
     ).select_related(
         'user__user'
-    ).prefetch_related(
-        'replies'
-    ).order_by('-created_at')
+    ).with_like_state(profile)
+    return keyset_page(comments, 'created_at', cursor, COMMENTS_PER_PAGE)
 
-    paginator = Paginator(comments, comments_per_page)
 
-    try:
-        comments_page = paginator.page(page)
-    except (EmptyPage, InvalidPage):
-        return JsonResponse({'comments_html': '', 'has_next': False})
+@login_required
+def load_more_comments(request, event_id):
+    event = get_object_or_404(Event, id=event_id)
+    comments, next_cursor = comments_page(event, request.user.profile, request.GET.get('cursor'))
 
     comments_html = render_to_string(
         'events/partials/comments_pagination.html',
-        {'comments': comments_page, 'event': event},
+        {'comments': comments, 'event': event, 'next_cursor': next_cursor},
         request=request
     )
 
     return JsonResponse({
         'comments_html': comments_html,
-        'has_next': comments_page.has_next()
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor
     })
 @login_required
 @require_POST
 def toggle_comment_like(request, comment_id):
-    comment = get_object_or_404(Comment, id=comment_id)
-    if request.user.profile in comment.likes.all():
+    comment = get_object_or_404(
+        Comment.objects.with_like_state(request.user.profile), id=comment_id
+    )
+    if comment.viewer_liked:
         comment.likes.remove(request.user.profile)
         is_liked = False
     else:
@@ -288,7 +339,7 @@ def toggle_comment_like(request, comment_id):
     
     return JsonResponse({
         'status': 'success',
-        'likes_count': comment.likes.count(),
+        'likes_count': comment.likes_total + (1 if is_liked else -1),
         'is_liked': is_liked
         
     
@@ -328,15 +379,10 @@ def delete_event(request, event_id):
 @login_required
 def campus_autocomplete(request):
     if 'term' in request.GET:
-        query = request.GET.get('term')
-
-        # Query for campus using Profile model
-        campuses = Profile.objects.filter(
-            Q(campus__icontains=query)
-        ).values('id', 'campus').distinct()[:10]
-
-        # Format the results to return campus data
-        results = [{'id': profile['id'], 'label': profile['campus'], 'value': profile['campus']} for profile in campuses]
+        # Served from the in-memory campus index instead of scanning profiles
+        campuses = campus_index.search(request.GET.get('term'))
+        results = [{'id': campus, 'label': campus, 'value': campus, 'count': total}
+                   for campus, total in campuses]
         return JsonResponse(results, safe=False)
 
     return JsonResponse([], safe=False)
@@ -368,6 +414,9 @@ def register_for_event(request, event_id):
                 'form_errors': form.errors
             }, status=400)
 
+        # Clashes are looked up in the cached schedule index before it changes
+        conflicts = schedule.find_conflicts(user_profile.pk, event)
+
         with transaction.atomic():
             # Get current registration counts
             registered_count = EventRegistration.objects.filter(
@@ -399,9 +448,6 @@ def register_for_event(request, event_id):
 
             registration.save()
 
-            # Clear status cache
-            cache.delete(f'event_status_{event_id}')
-
             # Send confirmation email
             try:
                 send_registration_email(registration)
@@ -412,7 +458,8 @@ def register_for_event(request, event_id):
                 'success': True,
                 'status': registration.status,
                 'waitlist_position': registration.waitlist_position,
-                'spots_left': event.spots_left
+                'spots_left': event.spots_left,
+                'conflicts': conflicts,
             }
 
             if registration.status == 'waitlist':
@@ -482,7 +529,7 @@ def event_attendees(request, event_id):
     event = get_object_or_404(Event, id=event_id)
     
     # Check if user is authorized to view attendees
-    if not (request.user.is_staff or event.organizer == request.user):
+    if not (request.user.is_staff or event.organizer.user_id == request.user.id):
         return HttpResponseForbidden("You don't have permission to view attendees.")
     
     registrations = EventRegistration.objects.filter(
@@ -496,6 +543,86 @@ def event_attendees(request, event_id):
     return render(request, 'events/event_attendees.html', context)
 
 
+ATTENDEE_EXPORT_FORMATS = {
+    'csv': (exports.stream_attendees_csv, 'text/csv; charset=utf-8'),
+    'jsonl': (exports.stream_attendees_jsonl, 'application/x-ndjson'),
+}
+
+
+@login_required
+def export_attendees(request, event_id, export_format):
+    """
+    Stream an event's registrations as CSV or JSON lines.
+    Only accessible by event organizers or admins
+    """
+    event = get_object_or_404(Event.objects.select_related('organizer'), id=event_id)
+
+    if not (request.user.is_staff or event.organizer.user_id == request.user.id):
+        return HttpResponseForbidden("You don't have permission to export attendees.")
+
+    if export_format not in ATTENDEE_EXPORT_FORMATS:
+        raise Http404("Unknown export format")
+
+    stream, content_type = ATTENDEE_EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(stream(event), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="event-{event.id}-attendees.{export_format}"'
+    return response
+
+
+@login_required
+def registration_ticket(request, event_id):
+    """QR code ticket of the viewer's registration for an event."""
+    registration = get_object_or_404(
+        EventRegistration, event_id=event_id, participant=request.user.profile, status='registered'
+    )
+    response = HttpResponse(tickets.ticket_qr_png(registration), content_type='image/png')
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+
+def _can_check_in(request, event_id):
+    organizer_user_id = Event.objects.filter(pk=event_id).values_list(
+        'organizer__user_id', flat=True
+    ).first()
+    if organizer_user_id is None:
+        raise Http404("Event not found")
+    return request.user.is_staff or organizer_user_id == request.user.id
+
+
+@login_required
+def event_checkin(request, event_id):
+    """
+    Door check-in. GET shows the scanner page; POST takes a single ``ticket``
+    or a JSON body ``{"tickets": [...]}`` for scans queued while offline.
+    Tickets are verified from their signature, the registrations they name
+    are loaded with one query, and the attendance marks saved with one UPDATE.
+    """
+    if not _can_check_in(request, event_id):
+        return HttpResponseForbidden("You don't have permission to check attendees in.")
+
+    if request.method == 'GET':
+        return render(request, 'events/checkin.html', {'event_id': event_id})
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Method not allowed'}, status=405)
+
+    if request.content_type == 'application/json':
+        try:
+            ticket_list = json.loads(request.body).get('tickets', [])
+        except (ValueError, AttributeError):
+            return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+        if not isinstance(ticket_list, list):
+            return JsonResponse({'success': False, 'error': 'tickets must be a list'}, status=400)
+    else:
+        ticket_list = [request.POST.get('ticket', '')]
+
+    ticket_list = [str(token).strip() for token in ticket_list[:500]]
+    results = [
+        {'ticket': token, 'result': result, 'name': name}
+        for token, (result, name) in zip(ticket_list, tickets.desk.check_in(event_id, ticket_list))
+    ]
+    return JsonResponse({'success': True, 'results': results})
+
+
 @login_required
 def waitlist_position(request, event_id):
     """
@@ -523,37 +650,52 @@ def waitlist_position(request, event_id):
             'error': 'Not on waitlist'
         }, status=404)
 
+@login_required
+def calendar_window(request):
+    """
+    Events overlapping ``start``..``end`` (YYYY-MM-DD, inclusive), bucketed per day.
+    """
+    try:
+        start_day = datetime.date.fromisoformat(request.GET.get('start', ''))
+        end_day = datetime.date.fromisoformat(request.GET.get('end', ''))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'start and end must be YYYY-MM-DD dates'}, status=400)
+
+    if end_day < start_day or (end_day - start_day).days >= calendar.MAX_WINDOW_DAYS:
+        return JsonResponse({
+            'success': False,
+            'error': f'The window must span 1 to {calendar.MAX_WINDOW_DAYS} days'
+        }, status=400)
+
+    return JsonResponse({'success': True, **calendar.get_calendar(start_day, end_day)})
+
+
+@login_required
+def my_schedule(request):
+    """The viewer's upcoming registrations in start order, with clashing events flagged."""
+    return JsonResponse({'success': True, **schedule.build_agenda(request.user.profile.pk)})
+
+
 @login_required
 def event_status(request, event_id):
     """
-    Get current event status including spots left and waitlist info
+    Get current event status including spots left and waitlist info.
+    Counts come from the cached status snapshot; only the viewer's own
+    registration is read from the database.
     """
-    event = get_object_or_404(Event, id=event_id)
-    
+    snapshot = get_event_status(event_id)
+    if snapshot is None:
+        return JsonResponse({'success': False, 'error': 'Event not found'}, status=404)
+
     # Get user's registration if exists
     registration = EventRegistration.objects.filter(
-        event=event,
+        event_id=event_id,
         participant=request.user.profile
-    ).first()
-    
-    # Count registrations
-    registered_count = EventRegistration.objects.filter(
-        event=event,
-        status='registered'
-    ).count()
-    
-    waitlist_count = EventRegistration.objects.filter(
-        event=event,
-        status='waitlist'
-    ).count()
-    
+    ).only('status', 'waitlist_position').first()
+
     response_data = {
         'success': True,
-        'total_spots': event.max_participants,
-        'spots_left': event.max_participants - registered_count if event.max_participants else None,
-        'registered_count': registered_count,
-        'waitlist_count': waitlist_count,
-        'is_full': event.max_participants and registered_count >= event.max_participants,
+        **snapshot,
         'user_status': {
             'is_registered': False,
             'status': None,
@@ -738,4 +880,62 @@ def cancel_registration(request, event_id):
         return JsonResponse({
             'success': False,
             'error': 'An unexpected error occurred. Please try again later.'
-        }, status=500)
\ No newline at end of file
+        }, status=500)
+
+# iCalendar feeds
+#
+# Feeds are streamed straight from the database and guarded by condition(),
+# whose ETag and Last-Modified come from cached feed versions (see ics.py).
+# A client polling an unchanged feed is answered with a 304 before any
+# event is read.
+
+def _ics_response(name, events, filename):
+    response = StreamingHttpResponse(
+        ics.stream_calendar(name, events),
+        content_type='text/calendar; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _user_feeds(request, token):
+    return (ics.user_feed(ics.profile_id_from_token(token)), ics.EVENTS_FEED)
+
+
+@condition(
+    etag_func=lambda request, token: ics.feed_etag(*_user_feeds(request, token)),
+    last_modified_func=lambda request, token: ics.feed_last_modified(*_user_feeds(request, token)),
+)
+def user_calendar_feed(request, token):
+    """Events the token's owner is registered or waitlisted for."""
+    profile_id = ics.profile_id_from_token(token)
+    if profile_id is None:
+        raise Http404("Unknown calendar feed")
+
+    events = Event.objects.filter(
+        registrations__participant_id=profile_id,
+        registrations__status__in=['registered', 'waitlist']
+    ).distinct()
+    return _ics_response('My Events', events, 'my-events.ics')
+
+
+@condition(
+    etag_func=lambda request, campus: ics.feed_etag(ics.campus_feed(campus)),
+    last_modified_func=lambda request, campus: ics.feed_last_modified(ics.campus_feed(campus)),
+)
+def campus_calendar_feed(request, campus):
+    """Public events of a campus."""
+    events = Event.objects.filter(is_public=True, campus__campus=campus)
+    return _ics_response(f'{campus} Events', events, 'campus-events.ics')
+
+
+@condition(
+    etag_func=lambda request, category_id: ics.feed_etag(ics.category_feed(category_id)),
+    last_modified_func=lambda request, category_id: ics.feed_last_modified(ics.category_feed(category_id)),
+)
+def category_calendar_feed(request, category_id):
+    """Public events of a category."""
+    category = get_object_or_404(EventCategory, id=category_id)
+    events = Event.objects.filter(is_public=True, category=category)
+    return _ics_response(f'{category.name} Events', events, 'category-events.ics')
@@ -1,16 +1,19 @@
+import asyncio
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from .models import Conversation, Message
+from .directory import contact_ids
+from .history import message_payload, messages_before
+from .models import Message, Participant
+from .persistence import writer
+from .presence import is_online, presence, presence_group
 from django.contrib.auth import get_user_model
-from notifications.models import Notification
-from django.contrib.contenttypes.models import ContentType
-from asgiref.sync import sync_to_async
-import datetime
-from profiles.models import Profile 
 
 User = get_user_model()
 
+READ_DELAY = 1  # seconds
+PRESENCE_WATCH_LIMIT = 50  # participants
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -19,7 +22,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
         self.room_group_name = f"chat_{self.conversation_id}"
         self.user_group_name = f"user_{self.user.username}"
 
-        if not await self.user_can_access_conversation(self.conversation_id):
+        # Membership is loaded once and refreshed by membership_changed
+        self.members = await self.get_members()
+        if self.user.id not in self.members:
             await self.close()
             return
 
@@ -28,104 +33,135 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         await self.channel_layer.group_add(self.user_group_name, self.channel_name)
 
-        # Mark user as online
-        await self.set_user_online_status(True)
-
-        # Notify other users in the conversation
-        await self.notify_user_status(True)
+        # Follow the status of the other participants
+        self.watched = set()
+        await self.watch_members()
 
         await self.accept()
+        self.joined = True
+
+        # Mark user as online
+        await presence.connect(self.user)
 
     async def disconnect(self, close_code):
-        # Mark user as offline
-        await self.set_user_online_status(False)
+        # Checked by flag, not membership: a user removed by membership_changed
+        # still has presence and groups to clean up
+        if not getattr(self, "joined", False):
+            return
 
-        # Notify other users
-        await self.notify_user_status(False)
+        # Don't leave this user's last messages waiting for the next batch
+        await writer.aflush()
 
-        # Leave groups
+        # Mark user as offline once their last socket is gone
+        await presence.disconnect(self.user)
+
+        # Leave groups; with no members left watch_members unwatches everyone
+        self.members = {}
+        await self.watch_members()
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
         await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
 
-    @database_sync_to_async
-    def set_user_online_status(self, is_online):
-        # Get or create profile for the user
-        profile, _ = Profile.objects.get_or_create(user=self.user)
-        profile.is_online = is_online
-        profile.last_seen = datetime.datetime.now(datetime.timezone.utc)
-        profile.save(update_fields=["is_online", "last_seen"])
-
-    async def notify_user_status(self, is_online):
-        conversation = await self.get_conversation()
-        for participant in await self.get_participants(conversation):
-            if participant != self.user:
-                # Get the online status from profile
-                profile = await self.get_user_profile(participant)
-                await self.channel_layer.group_send(
-                    f"user_{participant.username}",
-                    {
-                        "type": "user_status",
-                        "user": self.user.username,
-                        "status": "online" if is_online else "offline",
-                    },
-                )
-
-    @database_sync_to_async
-    def get_user_profile(self, user):
-        return Profile.objects.get_or_create(user=user)[0]
-    
-
+    async def watch_members(self):
+        """
+        Follow the status of the other participants. Groups larger than
+        PRESENCE_WATCH_LIMIT (course cohorts) don't show member status, so
+        joining one costs the same as joining a direct chat.
+        """
+        watched = set()
+        if len(self.members) <= PRESENCE_WATCH_LIMIT:
+            watched = set(self.members) - {self.user.id}
+        for user_id in self.watched - watched:
+            await self.channel_layer.group_discard(presence_group(user_id), self.channel_name)
+        for user_id in watched - self.watched:
+            await self.channel_layer.group_add(presence_group(user_id), self.channel_name)
+        self.watched = watched
+
+    @property
+    def recipient_ids(self):
+        return [user_id for user_id in self.members if user_id != self.user.id]
 
     async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
-        message = text_data_json["message"]
+        try:
+            text_data_json = json.loads(text_data)
+        except ValueError:
+            return
+        if not isinstance(text_data_json, dict):
+            return
+        frame_type = text_data_json.get("type", "message")
+        if frame_type == "history_before":
+            await self.send_history(text_data_json.get("cursor"))
+            return
+        if frame_type == "read":
+            self.schedule_mark_read()
+            return
 
-        # Save message and create notification
-        saved_message = await self.save_message_and_create_notification(message)
+        # Ignore unknown frames and empty messages rather than dropping the socket
+        content = text_data_json.get("message")
+        if frame_type != "message" or not isinstance(content, str) or not content.strip():
+            return
+
+        message = Message(
+            conversation_id=self.conversation_id,
+            sender=self.user,
+            content=content,
+        )
 
-        # Send message to room group
+        # Send message to room group, then queue it to be saved
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 "type": "chat_message",
-                "message": message,
+                "message": message.content,
                 "sender": self.user.username,
-                "timestamp": saved_message.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                "timestamp": message.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
             },
         )
+        await writer.submit(message, self.recipient_ids)
 
-    @database_sync_to_async
-    def get_conversation(self):
-        return Conversation.objects.get(id=self.conversation_id)
+    def schedule_mark_read(self):
+        # Read frames arriving within READ_DELAY share one update
+        pending = getattr(self, "mark_read_task", None)
+        if pending is None or pending.done():
+            self.mark_read_task = asyncio.get_running_loop().create_task(self.mark_read_later())
 
-    @database_sync_to_async
-    def get_participants(self, conversation):
-        return list(conversation.participants.all())
+    async def mark_read_later(self):
+        await asyncio.sleep(READ_DELAY)
+        # Queued messages need their ids before the watermark can cover them
+        await writer.aflush()
+        await self.mark_read()
 
     @database_sync_to_async
-    def user_can_access_conversation(self, conversation_id):
-        try:
-            conversation = Conversation.objects.get(id=conversation_id)
-            return self.user in conversation.participants.all()
-        except Conversation.DoesNotExist:
-            return False
+    def mark_read(self):
+        return Participant.objects.mark_read(self.conversation_id, self.user.id)
 
-    @database_sync_to_async
-    def save_message_and_create_notification(self, message):
-        conversation = Conversation.objects.get(id=self.conversation_id)
-        saved_message = Message.objects.create(
-            conversation=conversation, sender=self.user, content=message
+    async def send_history(self, cursor):
+        messages, next_cursor = await self.get_history(cursor)
+        await self.send(
+            text_data=json.dumps(
+                {"type": "history", "messages": messages, "next_cursor": next_cursor}
+            )
         )
 
-        for recipient in conversation.participants.exclude(id=self.user.id):
-            Notification.objects.create(
-                recipient=recipient,
-                notification_type="message",
-                content_type=ContentType.objects.get_for_model(conversation),
-                object_id=conversation.id,
+    @database_sync_to_async
+    def get_history(self, cursor):
+        messages, next_cursor = messages_before(self.conversation_id, cursor)
+        return [message_payload(message) for message in messages], next_cursor
+
+    @database_sync_to_async
+    def get_members(self):
+        """{user id: username} of the conversation's participants."""
+        try:
+            return dict(
+                User.objects.filter(conversations=self.conversation_id).values_list("id", "username")
             )
+        except ValueError:
+            return {}
 
-        return saved_message
+    async def membership_changed(self, event):
+        self.members = await self.get_members()
+        await self.watch_members()
+        if self.user.id not in self.members:
+            await self.close()
 
     async def chat_message(self, event):
         await self.send(
@@ -139,66 +175,62 @@ class ChatConsumer(AsyncWebsocketConsumer):
             )
         )
 
+    async def user_status(self, event):
+        await self.send(
+            text_data=json.dumps(
+                {"type": "status", "user": event["user"], "status": event["status"]}
+            )
+        )
+
 
 class StatusConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope["user"]
+        if not self.user.is_authenticated:
+            await self.close()
+            return
         self.user_group_name = f"user_{self.user.username}"
 
-        # Join user's personal group for status updates
+        # Join user's personal group for conversation updates
         await self.channel_layer.group_add(self.user_group_name, self.channel_name)
 
-        # Mark user as online
-        await self.set_user_online_status(True)
-
-        # Notify all users who have conversations with this user
-        await self.notify_status_to_contacts(True)
+        # Follow the status of the users this user has direct conversations
+        # with; group members are only watched from the chat page, see watch_members
+        self.contact_ids = await self.get_contact_ids()
+        for contact_id in self.contact_ids:
+            await self.channel_layer.group_add(presence_group(contact_id), self.channel_name)
 
         await self.accept()
 
+        # Contacts already online; later changes arrive as user_status events
+        for username in await self.get_online_contacts():
+            await self.send(text_data=json.dumps({"type": "status", "user": username, "status": "online"}))
+
+        # Mark user as online
+        await presence.connect(self.user)
+
     async def disconnect(self, close_code):
-        # Mark user as offline
-        await self.set_user_online_status(False)
+        if not self.user.is_authenticated:
+            return
 
-        # Notify contacts
-        await self.notify_status_to_contacts(False)
+        # Mark user as offline once their last socket is gone
+        await presence.disconnect(self.user)
 
-        # Leave group
+        # Leave groups
+        for contact_id in self.contact_ids:
+            await self.channel_layer.group_discard(presence_group(contact_id), self.channel_name)
         await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
 
     @database_sync_to_async
-    def set_user_online_status(self, is_online):
-        profile, _ = Profile.objects.get_or_create(user=self.user)
-        profile.is_online = is_online
-        profile.last_seen = datetime.datetime.now(datetime.timezone.utc)
-        profile.save(update_fields=["is_online", "last_seen"])
+    def get_contact_ids(self):
+        return contact_ids(self.user)
 
     @database_sync_to_async
-    def get_user_contacts(self):
-        # Get all users who have conversations with the current user
-        contacts = list(
-            User.objects.filter(conversations__participants=self.user)
-            .exclude(id=self.user.id)
-            .distinct()
-        )
-        # Get their profiles
-        contact_profiles = []
-        for contact in contacts:
-            profile, _ = Profile.objects.get_or_create(user=contact)
-            contact_profiles.append(profile)
-        return contacts  # Still return users for username access
-
-    async def notify_status_to_contacts(self, is_online):
-        contacts = await self.get_user_contacts()
-        for contact in contacts:
-            await self.channel_layer.group_send(
-                f"user_{contact.username}",
-                {
-                    "type": "user_status",
-                    "user": self.user.username,
-                    "status": "online" if is_online else "offline",
-                },
-            )
+    def get_online_contacts(self):
+        online = [contact_id for contact_id in self.contact_ids if is_online(contact_id)]
+        if not online:
+            return []
+        return list(User.objects.filter(id__in=online).values_list("username", flat=True))
 
     async def user_status(self, event):
         await self.send(
@@ -0,0 +1,190 @@
+# messaging/directory.py
+import bisect
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .models import Participant
+
+User = get_user_model()
+
+VERSION_CACHE_KEY = 'messaging:user_directory_version'
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+
+
+def normalize(text):
+    """Case, accent and whitespace insensitive form of a name."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def full_name(first_name, last_name):
+    return ' '.join(part for part in (first_name, last_name) if part)
+
+
+def indexed_names(user):
+    """The (username, full name) the directory holds for ``user``, or None if it leaves them out."""
+    if not user.is_active:
+        return None
+    return user.username, full_name(user.first_name, user.last_name)
+
+
+def contact_ids(user):
+    """Ids of the users ``user`` has a direct conversation with, in one query."""
+    keys = Participant.objects.filter(
+        user=user, conversation__pair_key__isnull=False
+    ).values_list('conversation__pair_key', flat=True)
+    ids = set()
+    for key in keys:
+        low, high = (int(part) for part in key.split(':'))
+        ids.add(high if low == user.pk else low)
+    ids.discard(user.pk)
+    return ids
+
+
+class UserDirectory:
+    """
+    In-process search index of usernames and first and last names.
+
+    Every word of a user's names (and the full name) goes into a sorted array
+    for bisect prefix lookups, and every trigram of the normalized names into
+    a posting set, so a query matching the middle of a name is an
+    intersection of a few sets rather than an icontains table scan.
+
+    Built from one query on first use and kept current by user signals; other
+    processes see a change through a version number in the cache and rebuild
+    on their next lookup, like the campus index of the events app.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._users = {}                   # user id -> (username, full name)
+        self._text = {}                    # user id -> normalized searchable text
+        self._words = []                   # sorted (word, user id) pairs
+        self._trigrams = defaultdict(set)  # trigram -> user ids
+
+    # Building and maintenance
+
+    def build(self):
+        rows = User.objects.filter(is_active=True).values_list('id', 'username', 'first_name', 'last_name')
+        with self._lock:
+            self._version = cache.get(VERSION_CACHE_KEY, 0)
+            self._users, self._text, self._trigrams = {}, {}, defaultdict(set)
+            words = []
+            for row in rows.iterator():
+                words.extend(self._add(*row))
+            self._words = sorted(words)
+
+    def _add(self, user_id, username, first_name, last_name):
+        """Index one user, returning their (word, id) pairs for the sorted array."""
+        name = full_name(first_name, last_name)
+        self._users[user_id] = (username, name)
+        text = self._text[user_id] = normalize(f'{username} {name}')
+        for trigram in trigrams(text):
+            self._trigrams[trigram].add(user_id)
+        return [(word, user_id) for word in self._index_words(username, name)]
+
+    def _remove(self, user_id):
+        if user_id not in self._users:
+            return
+        username, full_name = self._users.pop(user_id)
+        for trigram in trigrams(self._text.pop(user_id)):
+            self._trigrams[trigram].discard(user_id)
+        for pair in [(word, user_id) for word in self._index_words(username, full_name)]:
+            position = bisect.bisect_left(self._words, pair)
+            if position < len(self._words) and self._words[position] == pair:
+                del self._words[position]
+
+    def _index_words(self, username, full_name):
+        name = normalize(full_name)
+        return {normalize(username), name, *name.split()} - {''}
+
+    def _ensure_current(self):
+        if self._version is None or cache.get(VERSION_CACHE_KEY, 0) != self._version:
+            self.build()
+
+    def update(self, user):
+        """Re-index ``user`` after their names changed (or drop them if inactive)."""
+        with self._lock:
+            current = self._version is not None and cache.get(VERSION_CACHE_KEY, 0) == self._version
+            if current and self._users.get(user.pk) == indexed_names(user):
+                return
+            if current:
+                self._remove(user.pk)
+                if user.is_active:
+                    for pair in self._add(user.pk, user.username, user.first_name, user.last_name):
+                        bisect.insort(self._words, pair)
+            version = self._bump_version()
+            if current:
+                self._version = version
+
+    def remove(self, user_id):
+        with self._lock:
+            current = self._version is not None and cache.get(VERSION_CACHE_KEY, 0) == self._version
+            if current:
+                self._remove(user_id)
+            version = self._bump_version()
+            if current:
+                self._version = version
+
+    def _bump_version(self):
+        try:
+            return cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            cache.add(VERSION_CACHE_KEY, 1, None)
+            return cache.get(VERSION_CACHE_KEY, 1)
+
+    # Lookups
+
+    def _prefix_matches(self, query):
+        start = bisect.bisect_left(self._words, (query,))
+        matches = {}
+        for word, user_id in self._words[start:]:
+            if not word.startswith(query):
+                break
+            # Usernames starting with the query rank above a matching name
+            rank = 0 if normalize(self._users[user_id][0]).startswith(query) else 1
+            matches[user_id] = min(rank, matches.get(user_id, rank))
+        return matches
+
+    def _infix_matches(self, query):
+        postings = [self._trigrams.get(trigram, set()) for trigram in trigrams(query)]
+        if not postings:
+            return {}
+        candidates = set.intersection(*sorted(postings, key=len))
+        return {user_id: 2 for user_id in candidates if query in self._text[user_id]}
+
+    def search(self, term, contacts=(), exclude=None, limit=DEFAULT_LIMIT):
+        """
+        Up to ``limit`` [(user id, username, full name)] matching ``term``:
+        ``contacts`` first, then username prefixes, name prefixes and
+        matches inside a name, alphabetically within each group.
+        """
+        query = normalize(term)
+        if not query:
+            return []
+        with self._lock:
+            self._ensure_current()
+            matches = self._prefix_matches(query)
+            if len(query) >= 3:
+                for user_id, rank in self._infix_matches(query).items():
+                    matches.setdefault(user_id, rank)
+            matches.pop(exclude, None)
+            ranked = sorted(
+                matches.items(),
+                key=lambda match: (match[0] not in contacts, match[1], self._users[match[0]][0].casefold()),
+            )
+            return [(user_id, *self._users[user_id]) for user_id, _ in ranked[:limit]]
+
+
+user_directory = UserDirectory()
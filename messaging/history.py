@@ -0,0 +1,34 @@
+# messaging/history.py
+from core.pagination import keyset_page
+
+from .models import Message
+
+HISTORY_PAGE_SIZE = 30
+
+
+def messages_before(conversation_id, cursor=None, page_size=HISTORY_PAGE_SIZE):
+    """
+    The messages of a conversation preceding ``cursor`` (the latest ones
+    without a cursor), oldest first, and the cursor of the page before them.
+
+    Pages seek through the message_history index, so scrolling back through
+    years of messages costs the same as opening a new conversation.
+    """
+    messages, next_cursor = keyset_page(
+        Message.objects.filter(conversation_id=conversation_id).select_related('sender').only(
+            'conversation', 'content', 'timestamp', 'sender__username'
+        ),
+        'timestamp', cursor, page_size,
+    )
+    messages.reverse()
+    return messages, next_cursor
+
+
+def message_payload(message):
+    """A message in the shape the chat websocket sends."""
+    return {
+        "id": message.pk,
+        "message": message.content,
+        "sender": message.sender.username,
+        "timestamp": message.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+    }
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+import uuid
+
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+from messaging.models import Conversation
+from messaging.persistence import writer
+from messaging.routing import websocket_urlpatterns
+
+User = get_user_model()
+
+USERNAME_PREFIX = 'loadtest_'
+
+
+class QueryCounter:
+    """Counts the queries of every database connection, in every thread."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure ChatConsumer and StatusConsumer throughput: N users in M conversations send '
+        'messages over the in-memory channel layer while some of them reconnect their status '
+        'socket. Creates its own users and conversations and deletes only those afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Number of simulated users')
+        parser.add_argument('--conversations', type=int, default=10, help='Conversations the users are spread over')
+        parser.add_argument('--messages', type=int, default=20, help='Messages each user sends')
+        parser.add_argument(
+            '--interval', type=float, default=0.0,
+            help='Seconds each user waits between two messages'
+        )
+        parser.add_argument(
+            '--presence-churn', type=int, default=10,
+            help='Number of status socket reconnects spread over the run'
+        )
+        parser.add_argument('--timeout', type=float, default=60.0, help='Seconds to wait for delivery')
+        parser.add_argument('--keep', action='store_true', help='Keep the created users and conversations')
+
+    def handle(self, *args, **options):
+        # A prefix of its own, so the run never touches users it didn't create
+        prefix = f'{USERNAME_PREFIX}{uuid.uuid4().hex[:8]}_'
+        users, conversations = self.setup(prefix, options['users'], max(1, options['conversations']))
+        counter = QueryCounter()
+        connection_created.connect(counter.install)
+        for connection in connections.all():
+            counter.install(connection)
+        try:
+            with override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}):
+                report = asyncio.run(self.run(users, conversations, counter, options))
+        finally:
+            connection_created.disconnect(counter.install)
+            for connection in connections.all():
+                if counter in connection.execute_wrappers:
+                    connection.execute_wrappers.remove(counter)
+            if options['keep']:
+                self.stdout.write(f"Kept the users ({prefix}*) and conversations of this run")
+            else:
+                self.teardown(users, conversations)
+        self.print_report(report, options)
+
+    def setup(self, prefix, user_count, conversation_count):
+        User.objects.bulk_create([User(username=f'{prefix}{i}') for i in range(user_count)])
+        users = list(User.objects.filter(username__startswith=prefix).order_by('id'))
+        conversations = {}
+        for index in range(conversation_count):
+            members = users[index::conversation_count]
+            if members:
+                conversations[Conversation.objects.create_group_conversation(members)] = members
+        return users, conversations
+
+    def teardown(self, users, conversations):
+        Conversation.objects.filter(pk__in=[conversation.pk for conversation in conversations]).delete()
+        User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    async def connect(self, application, path, user):
+        communicator = WebsocketCommunicator(application, path)
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        if not connected:
+            raise RuntimeError(f'{user.username} could not connect to {path}')
+        return communicator
+
+    async def run(self, users, conversations, counter, options):
+        application = URLRouter(websocket_urlpatterns)
+
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        chats = {}
+        for conversation, members in conversations.items():
+            for user in members:
+                chats[user] = (conversation, await self.connect(application, f'/ws/chat/{conversation.pk}/', user))
+        statuses = {user: await self.connect(application, '/ws/status/', user) for user in users}
+        connected = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        memory = sum(stat.size_diff for stat in connected.compare_to(baseline, 'filename'))
+        sockets = len(chats) + len(statuses)
+
+        latencies = []
+        messages = options['messages']
+
+        async def send(user, communicator):
+            for number in range(messages):
+                await communicator.send_to(text_data=json.dumps({
+                    'message': json.dumps({'sent': time.perf_counter(), 'number': number}),
+                }))
+                if options['interval']:
+                    await asyncio.sleep(options['interval'])
+
+        async def receive(user, communicator, expected):
+            received = 0
+            while received < expected:
+                frame = json.loads(await communicator.receive_from(timeout=options['timeout']))
+                if frame.get('type') != 'message':
+                    continue
+                received += 1
+                if frame['sender'] != user.username:
+                    latencies.append(time.perf_counter() - json.loads(frame['message'])['sent'])
+
+        async def churn():
+            if not options['presence_churn']:
+                return
+            pause = max(0.001, messages * max(options['interval'], 0.001) / options['presence_churn'])
+            for _ in range(options['presence_churn']):
+                user = random.choice(users)
+                await statuses[user].disconnect()
+                statuses[user] = await self.connect(application, '/ws/status/', user)
+                await asyncio.sleep(pause)
+
+        queries_before = counter.count
+        started = time.perf_counter()
+        receivers = [
+            receive(user, communicator, messages * len(conversations[conversation]))
+            for user, (conversation, communicator) in chats.items()
+        ]
+        await asyncio.gather(
+            *receivers,
+            *(send(user, communicator) for user, (_, communicator) in chats.items()),
+            churn(),
+        )
+        elapsed = time.perf_counter() - started
+        await writer.aflush()
+        queries = counter.count - queries_before
+
+        for _, communicator in chats.values():
+            await communicator.disconnect()
+        for communicator in statuses.values():
+            await communicator.disconnect()
+
+        sent = messages * len(chats)
+        return {
+            'sent': sent,
+            'delivered': len(latencies) + sent,
+            'elapsed': elapsed,
+            'latencies': latencies,
+            'queries': queries,
+            'memory': memory,
+            'sockets': sockets,
+        }
+
+    def print_report(self, report, options):
+        latencies_ms = [latency * 1000 for latency in report['latencies']]
+        sent = report['sent']
+        self.stdout.write(
+            f"{options['users']} users, {options['conversations']} conversations, "
+            f"{options['messages']} messages each, {options['presence_churn']} presence reconnects"
+        )
+        self.stdout.write(f"Messages sent:        {sent} in {report['elapsed']:.2f}s "
+                          f"({sent / report['elapsed']:.0f}/s)")
+        self.stdout.write(f"Frames delivered:     {report['delivered']} "
+                          f"({report['delivered'] / report['elapsed']:.0f}/s)")
+        self.stdout.write(
+            f"Delivery latency ms:  p50 {percentile(latencies_ms, 50):.1f}  "
+            f"p95 {percentile(latencies_ms, 95):.1f}  p99 {percentile(latencies_ms, 99):.1f}  "
+            f"max {max(latencies_ms, default=0):.1f}  mean {statistics.fmean(latencies_ms) if latencies_ms else 0:.1f}"
+        )
+        self.stdout.write(f"DB queries / message: {report['queries'] / sent if sent else 0:.2f} "
+                          f"({report['queries']} total)")
+        self.stdout.write(f"Memory / connection:  {report['memory'] / report['sockets'] / 1024:.1f} KiB "
+                          f"({report['sockets']} sockets)")
@@ -0,0 +1,46 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from messaging.models import Conversation, Message, Participant, pair_key
+
+
+class Command(BaseCommand):
+    help = 'Give direct conversations their pair key, merging duplicate conversations of the same two users'
+
+    def handle(self, *args, **options):
+        members = defaultdict(list)
+        for conversation_id, user_id in Conversation.participants.through.objects.values_list(
+            'conversation_id', 'user_id'
+        ).order_by():
+            members[conversation_id].append(user_id)
+
+        keyed = dict(Conversation.objects.filter(pair_key__isnull=False).values_list('pair_key', 'pk'))
+        unkeyed = defaultdict(list)
+        for conversation_id in Conversation.objects.filter(
+            pair_key__isnull=True, is_group=False
+        ).order_by('created_at', 'pk').values_list('pk', flat=True):
+            users = members.get(conversation_id, [])
+            if 1 <= len(users) <= 2:
+                unkeyed[pair_key(users[0], users[-1])].append(conversation_id)
+
+        merged = 0
+        keepers = []
+        with transaction.atomic():
+            for key, conversation_ids in unkeyed.items():
+                # Keep the conversation already holding the key, else the oldest
+                keeper = keyed.get(key, conversation_ids[0])
+                duplicates = [pk for pk in conversation_ids if pk != keeper]
+                if duplicates:
+                    Message.objects.filter(conversation_id__in=duplicates).update(conversation_id=keeper)
+                    Conversation.objects.filter(pk__in=duplicates).delete()
+                    merged += len(duplicates)
+                    keepers.append(keeper)
+                if key not in keyed:
+                    Conversation.objects.filter(pk=keeper).update(pair_key=key)
+            Participant.objects.rebuild(keepers)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Keyed {len(unkeyed)} direct conversations, merged {merged} duplicates'
+        ))
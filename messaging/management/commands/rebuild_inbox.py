@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from messaging.models import Participant
+
+
+class Command(BaseCommand):
+    help = 'Recompute the last message and unread count of every conversation membership'
+
+    def handle(self, *args, **options):
+        updated = Participant.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {updated} inbox entries'))
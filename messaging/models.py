@@ -1,28 +1,55 @@
-from django.db import models
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
-from django.db.models import Q, Max
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+
+def pair_key(user1_id, user2_id):
+    """Canonical key of the direct conversation between two users."""
+    low, high = sorted((user1_id, user2_id))
+    return f"{low}:{high}"
+
+
 class ConversationManager(models.Manager):
     def get_or_create_conversation(self, user1, user2):
-        conversations = self.filter(participants=user1).filter(participants=user2)
-        if conversations.exists():
-            return conversations.first(), False
-        conversation = self.create()
-        conversation.participants.add(user1, user2)
+        # One indexed read; the unique key settles concurrent creations
+        key = pair_key(user1.pk, user2.pk)
+        conversation = self.filter(pair_key=key).first()
+        if conversation is not None:
+            return conversation, False
+        try:
+            with transaction.atomic():
+                conversation = self.create(pair_key=key)
+                conversation.participants.add(user1, user2)
+        except IntegrityError:
+            return self.get(pair_key=key), False
         return conversation, True
     
+    def create_group_conversation(self, users):
+        """A conversation between ``users``; members are added with one INSERT."""
+        with transaction.atomic():
+            conversation = self.create(is_group=True)
+            conversation.participants.add(*users)
+        return conversation
+
     def get_conversations_for_user(self, user):
-        return self.filter(participants=user).annotate(
-            last_message_time=Max('messages__timestamp'),
-            unread_count=models.Count(
-                'messages',
-                filter=models.Q(messages__read=False) & ~models.Q(messages__sender=user)
-            )
-        ).order_by('-last_message_time')
+        # Read from the user's memberships, which keep these values current
+        return self.filter(memberships__user=user).annotate(
+            last_message_time=F('memberships__last_message_at'),
+            unread_count=F('memberships__unread_count'),
+        ).order_by(F('last_message_time').desc(nulls_last=True))
 
 class Conversation(models.Model):
-    participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='conversations')
+    participants = models.ManyToManyField(
+        settings.AUTH_USER_MODEL, through='Participant', related_name='conversations'
+    )
+    # "<lower user id>:<higher user id>" for direct conversations, see pair_key
+    pair_key = models.CharField(max_length=41, unique=True, null=True, blank=True)
+    # Group conversations never get a pair key, however few members they have
+    is_group = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -34,14 +61,114 @@ class Conversation(models.Model):
     def get_other_participant(self, user):
         return self.participants.exclude(id=user.id).first()
 
+    def other_user_id(self, user_id):
+        """The other user of a direct conversation, read from its pair key."""
+        low, high = (int(part) for part in self.pair_key.split(':'))
+        return high if low == user_id else low
+
+
+class ParticipantManager(models.Manager):
+    def inbox(self, user):
+        """``user``'s memberships, most recent conversation first."""
+        return self.filter(user=user).order_by(F('last_message_at').desc(nulls_last=True), '-id')
+
+    def record_messages(self, messages):
+        """
+        Move the last message and unread counters of the conversations
+        ``messages`` were sent to; one UPDATE per conversation.
+        """
+        by_conversation = defaultdict(list)
+        for message in messages:
+            by_conversation[int(message.conversation_id)].append(message)
+        for conversation_id, sent in by_conversation.items():
+            last = max(sent, key=lambda message: message.timestamp)
+            # Everyone gets the batch as unread except what they sent themselves
+            own = Case(
+                *(When(user_id=sender_id, then=Value(count))
+                  for sender_id, count in Counter(message.sender_id for message in sent).items()),
+                default=Value(0),
+            )
+            self.filter(conversation_id=conversation_id).update(
+                last_message=last,
+                last_message_at=last.timestamp,
+                unread_count=F('unread_count') + len(sent) - own,
+            )
+
+    def mark_read(self, conversation_id, user_id, up_to=None):
+        """
+        Move ``user_id``'s read watermark to message ``up_to`` (the latest
+        message by default) with one UPDATE, recounting what is left unread.
+        Returns the new watermark, or None if it didn't move.
+        """
+        if up_to is None:
+            up_to = Message.objects.filter(conversation_id=conversation_id).order_by('-id').values_list(
+                'id', flat=True
+            ).first()
+            if up_to is None:
+                return None
+        moved = self.filter(
+            conversation_id=conversation_id, user_id=user_id, last_read_id__lt=up_to
+        ).update(last_read_id=up_to, unread_count=_unread_after(up_to))
+        return up_to if moved else None
+
+    def rebuild(self, conversation_ids=None):
+        """Recompute the denormalized fields from the messages, e.g. after a merge."""
+        memberships = self.all() if conversation_ids is None else self.filter(conversation_id__in=conversation_ids)
+        latest = Message.objects.filter(conversation=OuterRef('conversation_id')).order_by('-timestamp', '-id')
+        return memberships.update(
+            last_message=Subquery(latest.values('pk')[:1]),
+            last_message_at=Subquery(latest.values('timestamp')[:1]),
+            unread_count=_unread_after(OuterRef('last_read_id')),
+        )
+
+
+def _unread_after(watermark):
+    """Messages of others past ``watermark`` (an id or OuterRef), per membership row."""
+    unread = Message.objects.filter(
+        conversation=OuterRef('conversation_id'), id__gt=watermark
+    ).exclude(sender=OuterRef('user_id')).order_by().values('conversation').annotate(
+        total=models.Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(unread, output_field=models.IntegerField()), 0)
+
+
+class Participant(models.Model):
+    """A user's membership of a conversation, with what their inbox shows."""
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='conversation_memberships'
+    )
+    last_message = models.ForeignKey(
+        'Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    # Read watermark: id of the last message this member has read
+    last_read_id = models.BigIntegerField(default=0)
+    unread_count = models.PositiveIntegerField(default=0)
+
+    objects = ParticipantManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'user'], name='unique_conversation_participant'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_message_at'], name='participant_inbox'),
+        ]
+
 class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
-    read = models.BooleanField(default=False)
+    # Stamped on creation rather than on insert, as messages are saved in batches
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # History pages seek by (timestamp, id) within a conversation
+            models.Index(fields=['conversation', '-timestamp', '-id'], name='message_history'),
+        ]
     
-    def mark_as_read(self):
-        if not self.read:
-            self.read = True
-            self.save()
\ No newline at end of file
+    def mark_as_read(self, user):
+        """Mark this message, and everything before it, read by ``user``."""
+        return Participant.objects.mark_read(self.conversation_id, user.id, up_to=self.pk)
@@ -0,0 +1,143 @@
+# messaging/persistence.py
+import asyncio
+import logging
+import threading
+
+from channels.db import database_sync_to_async
+from django.db import transaction
+
+from notifications.models import Notification
+
+from .models import Message, Participant
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = 100
+FLUSH_RECIPIENTS = 5000  # notification rows a batch may owe before it is written
+FLUSH_INTERVAL = 0.25  # seconds
+NOTIFICATION_BATCH_SIZE = 1000
+
+
+class MessageWriter:
+    """
+    Per-process write-behind queue for chat messages.
+
+    Consumers broadcast a message first and then hand it over here. Queued
+    messages and the notifications of their recipients are written together
+    with two bulk_create calls in one transaction, once FLUSH_SIZE messages
+    are waiting or FLUSH_INTERVAL seconds after the first one was queued.
+    The same transaction moves the inbox entries (Participant rows) of the
+    conversations involved.
+
+    Notifications are aggregated: a recipient gets one unread "message"
+    notification per sender, however many messages the sender posts before
+    it is read. In a large group a batch is also written once it owes
+    FLUSH_RECIPIENTS notifications, and the sender that fills the queue
+    waits for the write, which slows a flood down to what the database takes.
+    Messages are stamped when they are received, so the stored timestamp is
+    the one that was broadcast. A batch that fails to save is retried per
+    conversation and then per message, so only the rows that can't be
+    written are lost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._recipients = 0
+        self._timer = None
+
+    async def submit(self, message, recipient_ids):
+        """Queue ``message`` and a notification for each of ``recipient_ids``."""
+        with self._lock:
+            self._pending.append((message, recipient_ids))
+            self._recipients += len(recipient_ids)
+            due = len(self._pending) >= FLUSH_SIZE or self._recipients >= FLUSH_RECIPIENTS
+        if due:
+            await database_sync_to_async(self.flush)()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(FLUSH_INTERVAL)
+        await database_sync_to_async(self.flush)()
+
+    def flush(self):
+        """Write every queued message; returns the number written."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._recipients = 0
+        if not pending:
+            return 0
+        try:
+            self._write(pending)
+        except Exception as e:
+            logger.warning(f"Error saving {len(pending)} chat messages, retrying one by one: {e}")
+            return self._write_each(pending)
+        return len(pending)
+
+    def _write(self, pending):
+        messages = [message for message, _ in pending]
+        for message in messages:
+            # A rolled back attempt may have left ids behind
+            message.pk = None
+        with transaction.atomic():
+            messages = Message.objects.bulk_create(messages)
+            Participant.objects.record_messages(messages)
+            Notification.objects.bulk_create(
+                self._new_notifications(pending), batch_size=NOTIFICATION_BATCH_SIZE
+            )
+
+    def _write_each(self, pending):
+        """
+        Retry a failed batch one conversation at a time, and the messages of
+        a conversation that still fails one at a time, so a single bad row
+        (say, of a conversation deleted meanwhile) only loses itself.
+        """
+        conversations = {}
+        for message, recipient_ids in pending:
+            conversations.setdefault(message.conversation_id, []).append((message, recipient_ids))
+        written = 0
+        for batch in conversations.values():
+            try:
+                self._write(batch)
+            except Exception:
+                for message, recipient_ids in batch:
+                    try:
+                        self._write([(message, recipient_ids)])
+                    except Exception as e:
+                        logger.error(
+                            f"Dropping chat message from {message.sender.username} "
+                            f"in conversation {message.conversation_id}: {e}"
+                        )
+                    else:
+                        written += 1
+            else:
+                written += len(batch)
+        return written
+
+    @staticmethod
+    def _new_notifications(pending):
+        """One notification per (recipient, sender) not already waiting unread."""
+        wanted = {}
+        for message, recipient_ids in pending:
+            sender = message.sender.username[:20]
+            for recipient_id in recipient_ids:
+                wanted[(recipient_id, sender)] = None
+        senders = {sender for _, sender in wanted}
+        recipients = list({recipient_id for recipient_id, _ in wanted})
+        for start in range(0, len(recipients), NOTIFICATION_BATCH_SIZE):
+            for unread in Notification.objects.filter(
+                notification_type='message', is_read=False, sender__in=senders,
+                recipient_id__in=recipients[start:start + NOTIFICATION_BATCH_SIZE],
+            ).values_list('recipient_id', 'sender'):
+                wanted.pop(unread, None)
+        return [
+            Notification(recipient_id=recipient_id, notification_type='message', sender=sender)
+            for recipient_id, sender in wanted
+        ]
+
+    async def aflush(self):
+        return await database_sync_to_async(self.flush)()
+
+
+writer = MessageWriter()
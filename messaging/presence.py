@@ -0,0 +1,140 @@
+# messaging/presence.py
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.utils import timezone
+
+from profiles.models import Profile
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_TTL = 90  # seconds without a heartbeat before a user counts as gone
+HEARTBEAT_INTERVAL = 30  # seconds
+OFFLINE_DEBOUNCE = 5  # seconds a user may be away (reload, new tab) without going offline
+
+
+def presence_group(user_id):
+    """Channel layer group receiving the status changes of one user."""
+    return f"presence_{user_id}"
+
+
+def _connections_key(user_id):
+    return f"presence:connections:{user_id}"
+
+
+def is_online(user_id):
+    return (cache.get(_connections_key(user_id)) or 0) > 0
+
+
+class PresenceService:
+    """
+    Per-process presence tracking for the websocket consumers.
+
+    Every process counts the sockets it holds per user. A user's first socket
+    in a process adds one to a connection count shared through the cache,
+    the last one removes it after OFFLINE_DEBOUNCE seconds unless the user
+    came back, so reloads and extra tabs don't flap the status. A status
+    change is sent once, to the user's presence group, which the consumers of
+    their contacts subscribe to.
+
+    While a process holds sockets it refreshes the shared counts every
+    HEARTBEAT_INTERVAL seconds, so counts left behind by a dead process
+    expire after PRESENCE_TTL. The same loop writes Profile.is_online and
+    last_seen for everyone who is online or went offline since the last run,
+    with one UPDATE each.
+    """
+
+    def __init__(self):
+        self._connections = {}
+        self._usernames = {}
+        self._pending_offline = {}
+        self._went_offline = set()
+        self._heartbeat = None
+
+    async def connect(self, user):
+        self._usernames[user.id] = user.username
+        count = self._connections.get(user.id, 0)
+        self._connections[user.id] = count + 1
+        if count:
+            return
+
+        pending = self._pending_offline.pop(user.id, None)
+        if pending is not None:
+            # Back within the debounce window: still counted as connected
+            pending.cancel()
+            return
+
+        key = _connections_key(user.id)
+        cache.add(key, 0, PRESENCE_TTL)
+        if cache.incr(key) == 1:
+            self._went_offline.discard(user.id)
+            await self._broadcast(user.id, "online")
+        cache.touch(key, PRESENCE_TTL)
+        self._ensure_heartbeat()
+
+    async def disconnect(self, user):
+        count = self._connections.get(user.id, 0) - 1
+        if count > 0:
+            self._connections[user.id] = count
+            return
+        self._connections.pop(user.id, None)
+        if user.id not in self._pending_offline:
+            self._pending_offline[user.id] = asyncio.get_running_loop().create_task(
+                self._go_offline(user.id)
+            )
+
+    async def _go_offline(self, user_id):
+        await asyncio.sleep(OFFLINE_DEBOUNCE)
+        self._pending_offline.pop(user_id, None)
+        key = _connections_key(user_id)
+        try:
+            remaining = cache.decr(key)
+        except ValueError:
+            # The count expired meanwhile
+            remaining = 0
+        if remaining <= 0:
+            cache.delete(key)
+            self._went_offline.add(user_id)
+            await self._broadcast(user_id, "offline")
+
+    async def _broadcast(self, user_id, status):
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        await channel_layer.group_send(
+            presence_group(user_id),
+            {"type": "user_status", "user": self._usernames.get(user_id, ""), "status": status},
+        )
+
+    def _ensure_heartbeat(self):
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.get_running_loop().create_task(self._run_heartbeat())
+
+    async def _run_heartbeat(self):
+        while self._connections or self._pending_offline or self._went_offline:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            for user_id in self._connections:
+                cache.touch(_connections_key(user_id), PRESENCE_TTL)
+            await self.flush()
+
+    async def flush(self):
+        online = list(self._connections)
+        offline, self._went_offline = self._went_offline, set()
+        try:
+            await database_sync_to_async(self._save)(online, offline)
+        except Exception as e:
+            logger.error(f"Error saving presence of {len(online) + len(offline)} users: {e}")
+
+    @staticmethod
+    def _save(online, offline):
+        now = timezone.now()
+        if online:
+            Profile.objects.filter(user_id__in=online).update(is_online=True, last_seen=now)
+        if offline:
+            Profile.objects.filter(user_id__in=offline).update(is_online=False, last_seen=now)
+
+
+presence = PresenceService()
@@ -0,0 +1,78 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.db.models import DEFERRED
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .directory import indexed_names, user_directory
+from .models import Conversation
+
+User = get_user_model()
+
+DIRECTORY_FIELDS = {'username', 'first_name', 'last_name', 'is_active'}
+
+logger = logging.getLogger(__name__)
+
+
+def _announce_membership_change(conversation_ids):
+    # Open ChatConsumers cache the participants of their conversation
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for conversation_id in conversation_ids:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                f"chat_{conversation_id}", {"type": "membership_changed"}
+            )
+        except Exception as e:
+            logger.error(f"Error announcing membership change of conversation {conversation_id}: {e}")
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def conversation_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # pk_set is not provided when a user's conversations are cleared
+        instance._cleared_conversation_ids = list(instance.conversations.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        conversation_ids = [instance.pk]
+    elif action == 'post_clear':
+        conversation_ids = instance.__dict__.pop('_cleared_conversation_ids', [])
+    else:
+        conversation_ids = list(pk_set)
+    transaction.on_commit(lambda: _announce_membership_change(conversation_ids))
+
+
+@receiver(post_init, sender=User)
+def remember_indexed_names(sender, instance, **kwargs):
+    # Remembered at load time so saves can tell whether the directory changes.
+    # Only when every indexed field is loaded, so only() doesn't fetch them.
+    if DIRECTORY_FIELDS <= instance.__dict__.keys():
+        instance._indexed_names = indexed_names(instance)
+    else:
+        instance._indexed_names = DEFERRED
+
+
+@receiver(post_save, sender=User)
+def update_user_directory(sender, instance, created, update_fields=None, **kwargs):
+    # Logins save last_login only, which the directory doesn't index
+    if update_fields is not None and not DIRECTORY_FIELDS & set(update_fields):
+        return
+    names = indexed_names(instance)
+    if not created and names == instance._indexed_names:
+        return
+    instance._indexed_names = names
+    # Other processes rebuild on the version bump, so only bump once the rows are visible
+    transaction.on_commit(lambda: user_directory.update(instance))
+
+
+@receiver(post_delete, sender=User)
+def remove_from_user_directory(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: user_directory.remove(user_id))
@@ -1,3 +1,97 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Conversation, Message, Participant, pair_key
+
+
+class ParticipantCounterTests(TestCase):
+    """
+    The inbox reads last messages and unread counts from Participant rows,
+    which record_messages and mark_read keep current without recounting.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob, cls.carol = (
+            User.objects.create_user(name, f'{name}@example.com', 'password') for name in ('alice', 'bob', 'carol')
+        )
+        cls.conversation = Conversation.objects.create()
+        cls.conversation.participants.add(cls.alice, cls.bob, cls.carol)
+
+    def send(self, *senders):
+        messages = Message.objects.bulk_create([
+            Message(conversation=self.conversation, sender=sender, content=f'From {sender.username}')
+            for sender in senders
+        ])
+        Participant.objects.record_messages(messages)
+        return messages
+
+    def membership(self, user):
+        return Participant.objects.get(conversation=self.conversation, user=user)
+
+    def test_record_messages_counts_only_other_senders(self):
+        messages = self.send(self.alice, self.alice, self.bob)
+        self.assertEqual(self.membership(self.alice).unread_count, 1)
+        self.assertEqual(self.membership(self.bob).unread_count, 2)
+        self.assertEqual(self.membership(self.carol).unread_count, 3)
+        self.assertEqual(self.membership(self.carol).last_message, messages[-1])
+
+    def test_mark_read_moves_watermark_and_recounts(self):
+        messages = self.send(self.alice, self.bob, self.alice)
+        self.assertEqual(
+            Participant.objects.mark_read(self.conversation.pk, self.carol.pk, messages[0].pk), messages[0].pk
+        )
+        self.assertEqual(self.membership(self.carol).unread_count, 2)
+        self.assertEqual(Participant.objects.mark_read(self.conversation.pk, self.carol.pk), messages[-1].pk)
+        self.assertEqual(self.membership(self.carol).unread_count, 0)
+
+    def test_mark_read_never_moves_back(self):
+        messages = self.send(self.alice, self.bob)
+        Participant.objects.mark_read(self.conversation.pk, self.carol.pk)
+        self.assertIsNone(Participant.objects.mark_read(self.conversation.pk, self.carol.pk, messages[0].pk))
+        membership = self.membership(self.carol)
+        self.assertEqual(membership.last_read_id, messages[-1].pk)
+        self.assertEqual(membership.unread_count, 0)
+
+
+class MergeDirectConversationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob = (
+            User.objects.create_user(name, f'{name}@example.com', 'password') for name in ('alice', 'bob')
+        )
+
+    def conversation_without_key(self, *senders):
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.alice, self.bob)
+        for sender in senders:
+            Message.objects.create(conversation=conversation, sender=sender, content='Hello')
+        return conversation
+
+    def test_duplicates_are_merged_into_the_oldest(self):
+        oldest = self.conversation_without_key(self.alice)
+        duplicate = self.conversation_without_key(self.bob, self.bob)
+        call_command('merge_direct_conversations', stdout=StringIO())
+
+        self.assertFalse(Conversation.objects.filter(pk=duplicate.pk).exists())
+        oldest.refresh_from_db()
+        self.assertEqual(oldest.pair_key, pair_key(self.alice.pk, self.bob.pk))
+        self.assertEqual(oldest.messages.count(), 3)
+        membership = Participant.objects.get(conversation=oldest, user=self.alice)
+        self.assertEqual(membership.unread_count, 2)
+        self.assertEqual(membership.last_message, oldest.messages.order_by('-id').first())
+
+    def test_group_conversations_of_two_are_left_alone(self):
+        direct = self.conversation_without_key(self.alice)
+        group = Conversation.objects.create_group_conversation([self.alice, self.bob])
+        Message.objects.create(conversation=group, sender=self.bob, content='Hello group')
+        call_command('merge_direct_conversations', stdout=StringIO())
+
+        group.refresh_from_db()
+        self.assertIsNone(group.pair_key)
+        self.assertEqual(group.messages.count(), 1)
+        direct.refresh_from_db()
+        self.assertEqual(direct.pair_key, pair_key(self.alice.pk, self.bob.pk))
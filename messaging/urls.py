@@ -3,5 +3,7 @@ from . import views
 
 urlpatterns = [
     path('chat/<str:username>/', views.chat_room, name='chat_room'),
+    path('conversation/<int:conversation_id>/history/', views.chat_history, name='chat_history'),
+    path('users/search/', views.user_search, name='user_search'),
     path('inbox/', views.inbox, name='inbox'),
 ]
\ No newline at end of file
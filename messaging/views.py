@@ -1,8 +1,11 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from .models import Conversation, Message
+from django.http import JsonResponse
+from .models import Conversation, Participant
+from .directory import DEFAULT_LIMIT, MAX_LIMIT, contact_ids, user_directory
+from .history import message_payload, messages_before
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Exists, OuterRef
+from django.urls import reverse
 
 User = get_user_model()
 
@@ -11,40 +14,64 @@ def chat_room(request, username):
     other_user = get_object_or_404(User, username=username)
     conversation, created = Conversation.objects.get_or_create_conversation(request.user, other_user)
     
-    # Fetch messages for this conversation
-    messages = Message.objects.filter(conversation=conversation).order_by('timestamp')
+    Participant.objects.mark_read(conversation.id, request.user.id)
+
+    # Latest messages only; older ones are loaded on scrollback
+    messages, history_cursor = messages_before(conversation.id)
     
     return render(request, 'messaging/alternate.html', {
         'conversation': conversation,
         'other_user': other_user,
         'conversation_id': conversation.id,
         'messages': messages,  # Pass messages to the template
+        'history_cursor': history_cursor,
+    })
+
+
+@login_required
+def chat_history(request, conversation_id):
+    conversation = get_object_or_404(Conversation, id=conversation_id, participants=request.user)
+    messages, next_cursor = messages_before(conversation.id, request.GET.get('before'))
+
+    return JsonResponse({
+        'messages': [message_payload(message) for message in messages],
+        'has_more': next_cursor is not None,
+        'next_cursor': next_cursor,
     })
 
 
 @login_required
 def inbox(request):
-    # Get all users you've chatted with
-    chat_users = User.objects.filter(
-        conversations__participants=request.user
-    ).distinct().exclude(id=request.user.id)
+    # Users you've chatted with, most recent first, from your inbox entries
+    memberships = list(
+        Participant.objects.inbox(request.user).filter(
+            conversation__pair_key__isnull=False
+        ).select_related('conversation').only(
+            'unread_count', 'last_message_at', 'conversation__pair_key'
+        )
+    )
+    other_ids = [membership.conversation.other_user_id(request.user.id) for membership in memberships]
+    users_by_id = User.objects.in_bulk(other_ids)
+    chat_users = []
+    for membership, other_id in zip(memberships, other_ids):
+        user = users_by_id.get(other_id)
+        if user is not None and other_id != request.user.id:
+            user.unread_count = membership.unread_count
+            user.last_message_at = membership.last_message_at
+            chat_users.append(user)
 
     # Handle search functionality
     search_query = request.GET.get('q')
     if search_query:
-        users = User.objects.filter(
-            Q(username__icontains=search_query) | 
-            Q(first_name__icontains=search_query) | 
-            Q(last_name__icontains=search_query)
-        ).exclude(id=request.user.id).annotate(
-            is_contact=Exists(
-                Conversation.objects.filter(
-                    participants=request.user
-                ).filter(
-                    participants=OuterRef('pk')
-                )
-            )
-        )
+        contacts = contact_ids(request.user)
+        matches = user_directory.search(search_query, contacts=contacts, exclude=request.user.id)
+        users_by_id = User.objects.in_bulk([user_id for user_id, _, _ in matches])
+        users = []
+        for user_id, _, _ in matches:
+            user = users_by_id.get(user_id)
+            if user is not None:
+                user.is_contact = user_id in contacts
+                users.append(user)
     else:
         users = None
 
@@ -54,3 +81,26 @@ def inbox(request):
         'search_query': search_query
     })
 
+
+
+@login_required
+def user_search(request):
+    """Type-ahead for the inbox search box: top matches as JSON, contacts first."""
+    try:
+        limit = min(int(request.GET.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    query = request.GET.get('q', '')
+    contacts = contact_ids(request.user) if query.strip() else set()
+    matches = user_directory.search(query, contacts=contacts, exclude=request.user.id, limit=limit)
+    return JsonResponse({
+        'results': [
+            {
+                'username': username,
+                'name': full_name,
+                'is_contact': user_id in contacts,
+                'url': reverse('chat_room', args=[username]),
+            }
+            for user_id, username, full_name in matches
+        ],
+    })
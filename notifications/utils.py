@@ -8,4 +8,5 @@ def get_notification_types():
         ("forum", "New Forum"),
         ("Event", "New Event"),
         ("poll", "New Poll"),
+        ("reminder", "Event Reminder"),
     ]
@@ -374,6 +374,28 @@ function updateRepliesCount(commentId) {
     }
 }
 
+async function loadMoreComments(button) {
+    const eventId = document.getElementById('event-container')?.dataset.eventId;
+    if (!eventId || !button.dataset.cursor) return;
+
+    button.disabled = true;
+    try {
+        const response = await fetch(
+            `/events/${eventId}/comments/?cursor=${encodeURIComponent(button.dataset.cursor)}`
+        );
+        if (!response.ok) throw new Error('Failed to load comments');
+
+        const data = await response.json();
+        // The returned fragment carries its own button when more pages exist
+        button.insertAdjacentHTML('beforebegin', data.comments_html);
+        button.remove();
+    } catch (error) {
+        console.error('Error loading comments:', error);
+        button.disabled = false;
+        showNotification('Could not load more comments', 'danger');
+    }
+}
+
 function showNotification(message, type = 'success') {
     // Create notification element
     const notification = document.createElement('div');
@@ -1,6 +1,10 @@
 document.addEventListener('DOMContentLoaded', function() {
-    const eventId = document.getElementById('event-container')?.dataset.eventId;
+    const eventContainer = document.getElementById('event-container');
+    const eventId = eventContainer?.dataset.eventId;
     if (!eventId) return;
+    // Dates of a recurring event that aren't stored yet register through their own URL
+    const registerUrl = eventContainer.dataset.registerUrl || `/events/event/${eventId}/register/`;
+    const isUnstoredOccurrence = eventContainer.dataset.occurrence === 'true';
 
     const registrationModal = new bootstrap.Modal(document.getElementById('registrationModal'));
     const form = document.getElementById('registrationForm');
@@ -34,7 +38,7 @@ document.addEventListener('DOMContentLoaded', function() {
     function updateRegistrationButton(data) {
         if (!registerButton) return;
     
-        const maxParticipants = data.max_participants;
+        const maxParticipants = data.total_spots;
         const spotsLeft = data.spots_left;
     
         registerButton.disabled = false;
@@ -98,7 +102,7 @@ document.addEventListener('DOMContentLoaded', function() {
             // Add additional debugging information
             formData.append('debug', 'frontend_submission');
             
-            const response = await fetch(`/events/event/${eventId}/register/`, {
+            const response = await fetch(registerUrl, {
                 method: 'POST',
                 body: formData,
                 headers: {
@@ -113,7 +117,7 @@ document.addEventListener('DOMContentLoaded', function() {
             // Handle response
             if (data.success) {
                 // Immediate success handling
-                showAlert('success', data.message);
+                showAlert('success', data.message, conflictDetails(data.conflicts));
                  // Update UI based on registration status
                 if (data.status === 'waitlist') {
                     document.getElementById('registration-status').innerHTML = 
@@ -221,6 +225,16 @@ document.addEventListener('DOMContentLoaded', function() {
     //     alertsContainer.appendChild(alert);
     // }
 
+    function conflictDetails(conflicts) {
+        if (!conflicts || !conflicts.length) return '';
+        const titles = conflicts.map(conflict => {
+            const span = document.createElement('span');
+            span.textContent = conflict.title;
+            return span.innerHTML;
+        });
+        return `Heads up: this overlaps with ${titles.join(', ')} in your schedule.`;
+    }
+
     function showAlert(type, message, details = '') {
         if (!alertsContainer) return;
         
@@ -276,8 +290,51 @@ document.addEventListener('DOMContentLoaded', function() {
         cancelButton.addEventListener('click', handleCancellation);
     }
     
-    // Initial status check
-    checkEventStatus();
-    // Periodic status check
-    setInterval(checkEventStatus, 30000);
+    // Live status updates are pushed over a websocket; polling is only a
+    // fallback while the socket is down.
+    let statusSocket = null;
+    let pollTimer = null;
+    let lastVersion = 0;
+
+    function startPolling() {
+        if (pollTimer) return;
+        checkEventStatus();
+        pollTimer = setInterval(checkEventStatus, 30000);
+    }
+
+    function stopPolling() {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+
+    function connectStatusSocket() {
+        const scheme = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+        statusSocket = new WebSocket(
+            scheme + window.location.host + '/ws/events/' + eventId + '/status/'
+        );
+
+        statusSocket.onopen = stopPolling;
+
+        statusSocket.onmessage = function (e) {
+            const data = JSON.parse(e.data);
+            // Ignore snapshots older than the one already shown
+            if (data.type !== 'event_status' || data.version <= lastVersion) return;
+            lastVersion = data.version;
+            updateStatusDisplay(data);
+            updateRegistrationButton(data);
+        };
+
+        statusSocket.onclose = function () {
+            startPolling();
+            setTimeout(connectStatusSocket, 10000);
+        };
+    }
+
+    if (isUnstoredOccurrence) {
+        // Nobody has registered for this date yet, so there is nothing to follow
+    } else if ('WebSocket' in window) {
+        connectStatusSocket();
+    } else {
+        startPolling();
+    }
 });
\ No newline at end of file